@@ -0,0 +1,18 @@
+# Generated by Django 4.2.19 on 2025-04-10 10:12
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inferences', '0008_alter_inference_samples_allocation'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inference',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['inference_chain'], name='inference_chain_gin'),
+        ),
+    ]
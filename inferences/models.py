@@ -1,17 +1,17 @@
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext as _
 from django.contrib.auth.models import User
-from collections import defaultdict
 from django.core.files import File
 from django.conf import settings
 from django.db import models
 from ete3 import Tree
+import numpy as np
 import tempfile
 import inspect
 import base64
 import random
-import uuid
 import os
 
 from inferences.utilities.dta.ph_dta import run_phangorn_dta
@@ -54,10 +54,9 @@ from inferences.utilities.vis_tree.tree_thinning import thin_tree
 
 
 def generate_short_uuid(length=8):
-    """Generate a short UUID by encoding a UUID4 in Base62."""
-    uuid_bytes = uuid.uuid4().bytes  # Get the raw UUID bytes
-    short_uuid = base64.urlsafe_b64encode(uuid_bytes).decode('utf-8').rstrip('=')  # Base64 encode and strip padding
-    return short_uuid[:length]
+    """Generate a short UUID by Base64-encoding 16 random bytes (as in a UUID4)."""
+    # encode the raw bytes directly (no UUID object); the first 22 characters are never padding
+    return base64.urlsafe_b64encode(os.urandom(16))[:length].decode('ascii')
 
 
 # Model for samples allocation
@@ -270,6 +269,11 @@ class Inference(models.Model):
     evaluations = models.JSONField(blank=True, null=True) # evaluation metrics for the inference
     random_seed = models.PositiveIntegerField(default=generate_random_seed, blank=True, null=True) # random seed for reproducibility
 
+    class Meta:
+        indexes = [
+            GinIndex(fields=['inference_chain'], name='inference_chain_gin'), # for descendant lookups (inference_chain__contains)
+        ]
+
     def __str__(self):
         return self.uuid
     
@@ -286,14 +290,18 @@ class Inference(models.Model):
                 raise ValidationError("Only one root inference is allowed.")
 
         # populate inference_chain
+        self.populate_inference_chain()
+
+        # Proceed with saving if validation passes
+        super().save(*args, **kwargs)
+
+    # populate inference_chain (UUIDs of all inferences in the chain, from root to current)
+    def populate_inference_chain(self):
         if self.head is None:
             self.inference_chain = [self.uuid]
         else:
             # Take parent's chain and append this node's uuid
             self.inference_chain = self.head.inference_chain + [self.uuid]
-
-        # Proceed with saving if validation passes
-        super().save(*args, **kwargs)
         
     @property
     def depth(self):
@@ -392,47 +400,29 @@ class Inference(models.Model):
         duration_days = self.simulation.duration_days
         populations = self.simulation.populations
         
-        # Initialize defaultdicts for all three result types
-        current_deme_sample_counts = defaultdict(lambda: defaultdict(int))
-        previous_deme_sample_counts = defaultdict(lambda: defaultdict(int))
-        remaining_deme_sample_counts = defaultdict(lambda: defaultdict(int))
-        
-        # Group by deme and time
-        grouped = samples_df.groupby(["deme", "time"])
-        
-        # Process each group to categorize samples
-        for (deme, time), group in grouped:
-            deme_int = int(deme)
-            time_int = int(time)
-            
-            for sample_id in group["sample_id"]:
-                if sample_id in current_samples_set:
-                    current_deme_sample_counts[deme_int][time_int] += 1
-                elif sample_id in previous_samples_set:
-                    previous_deme_sample_counts[deme_int][time_int] += 1
-                else:
-                    remaining_deme_sample_counts[deme_int][time_int] += 1
-        
-        # Fill in missing days for all demes in all three result types
-        deme_keys = populations.keys()
-        
-        # Process current samples
-        current_results = {
-            deme: [current_deme_sample_counts[int(deme)][t] for t in range(duration_days)]
-            for deme in deme_keys
-        }
-        
-        # Process previous samples
-        previous_results = {
-            deme: [previous_deme_sample_counts[int(deme)][t] for t in range(duration_days)]
-            for deme in deme_keys
-        }
-        
-        # Process remaining samples
-        remaining_results = {
-            deme: [remaining_deme_sample_counts[int(deme)][t] for t in range(duration_days)]
-            for deme in deme_keys
-        }
+        # Categorise every sample in a single pass (0: current, 1: previous, 2: remaining)
+        sample_ids = samples_df["sample_id"]
+        category = np.where(sample_ids.isin(current_samples_set), 0,
+                            np.where(sample_ids.isin(previous_samples_set), 1, 2))
+
+        # Map samples to (deme, day) cells, ignoring demes/days outside the simulation
+        deme_keys = list(populations.keys())
+        deme_to_row = {int(deme): row for row, deme in enumerate(deme_keys)}
+        rows = samples_df["deme"].map(deme_to_row).to_numpy(dtype=float)
+        times = samples_df["time"].to_numpy(dtype=int)
+        valid = ~np.isnan(rows) & (times >= 0) & (times < duration_days)
+
+        # Count samples per (category, deme, day) with a single bincount
+        num_cells = len(deme_keys) * duration_days
+        cell = rows[valid].astype(int) * duration_days + times[valid]
+        counts = np.bincount(category[valid] * num_cells + cell, minlength=3 * num_cells)
+        counts = counts.reshape(3, len(deme_keys), duration_days)
+
+        # Split into the three result types, keyed by deme
+        current_results, previous_results, remaining_results = (
+            {deme: counts[i, row].tolist() for row, deme in enumerate(deme_keys)}
+            for i in range(3)
+        )
         
         return current_results, previous_results, remaining_results
     
@@ -693,15 +683,7 @@ class Inference(models.Model):
             }
 
         # Get earliest introductions from ground truth
-        true_events = self.simulation.migratory_events
-        true_earliest_introductions = {}
-        for event in true_events:
-            time, origin, destination = event
-            if destination not in true_earliest_introductions or time < true_earliest_introductions[destination]['time']:
-                true_earliest_introductions[destination] = {
-                    'time': time,
-                    'source': origin
-                }
+        true_earliest_introductions = self.simulation.get_first_importations()
         # Add outbreak origin as the earliest introduction for the root deme
         true_earliest_introductions[self.simulation.outbreak_origin] = {
             'time': 0,
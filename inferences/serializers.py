@@ -32,7 +32,7 @@ class InferenceSerializer(serializers.ModelSerializer):
         }
 
 
-    def create(self, validated_data):
+    def prepare_create_data(self, validated_data):
         # automatically assign the current user if not explicitly provided
         user = self.context['request'].user
         validated_data['user'] = user
@@ -46,7 +46,21 @@ class InferenceSerializer(serializers.ModelSerializer):
         if "random_seed" in validated_data and validated_data["random_seed"] is None and validated_data["dta_method"] is not None:
             del validated_data["random_seed"]
 
-        return super().create(validated_data)
+        return validated_data
+
+    def create(self, validated_data):
+        return super().create(self.prepare_create_data(validated_data))
+
+    def save_replicates(self, replicate_num):
+        # create replicate_num inferences from the same validated data with a single INSERT
+        # (each replicate still gets its own uuid and, unless one was given, its own random_seed);
+        # bulk_create bypasses Inference.save, so the inference chain is populated here, and
+        # replicates always have a head, so the single-root check in Inference.save does not apply
+        validated_data = self.prepare_create_data(dict(self.validated_data))
+        inferences = [Inference(**validated_data) for _ in range(replicate_num)]
+        for inference in inferences:
+            inference.populate_inference_chain()
+        return Inference.objects.bulk_create(inferences)
     
 
 class InferenceSimpleSerializer(InferenceSerializer):
@@ -1,5 +1,6 @@
 import numpy as np
 import pandas as pd
+from inferences.utilities.sampling.temporal_sampling import build_incidence_matrix
 
 
 def weighted_spatial_sampling(
@@ -71,9 +72,9 @@ def weighted_spatial_sampling(
     if weighting_strategy == "population" and population_sizes is None:
         raise ValueError("Must provide `population_sizes` when weighting_strategy='population'.")
 
-    # Convert deme keys in case_incidence to int if needed
-    if case_incidence is not None:
-        case_incidence = {int(k): v for k, v in case_incidence.items()}
+    # Convert case_incidence to a 2-D array (one row per deme) if needed
+    if weighting_strategy == "cases":
+        incidence_arr, deme_to_row = build_incidence_matrix(case_incidence)
 
     # Convert deme keys in population_sizes to int if needed
     if population_sizes is not None:
@@ -86,8 +87,12 @@ def weighted_spatial_sampling(
     # Determine outbreak duration
     D = len(allocation)
 
-    # Main loop over days
-    selected_list = []
+    # Single random generator shared across days (rather than reseeding every day)
+    rng = np.random.default_rng(random_state)
+
+    # Main loop over days; we only collect the index labels of the selected samples
+    # and gather them once at the end
+    selected_index = []
     for d in range(D):
         target_n = allocation[d]
         if target_n <= 0:
@@ -108,12 +113,9 @@ def weighted_spatial_sampling(
 
         elif weighting_strategy == "cases":
             # case_incidence[deme_id][day] / bin_count
-            def get_incidence(row):
-                deme_id = row["deme"]
-                return case_incidence[deme_id][d]
-
-            # Incidence for each sample
-            day_subset["deme_incidence"] = day_subset.apply(get_incidence, axis=1)
+            # Incidence for each sample (looked up for all rows at once)
+            rows = day_subset["deme"].map(deme_to_row).to_numpy()
+            day_subset["deme_incidence"] = incidence_arr[rows, d]
 
             # Weight per sample = incidence / number_of_samples_in_that_deme
             day_subset["weight"] = day_subset["deme_incidence"] / day_subset["deme_count"]
@@ -141,21 +143,21 @@ def weighted_spatial_sampling(
 
         # If allocation is >= total available, take them all
         if target_n >= len(day_subset):
-            selected = day_subset
+            selected = day_subset.index
         else:
             # Weighted sampling without replacement
             selected = day_subset.sample(
                 n=target_n,
                 replace=False,
                 weights="weight",
-                random_state=random_state
-            )
+                random_state=rng
+            ).index
         
-        selected_list.append(selected)
+        selected_index.append(selected.to_numpy())
 
-    # Concatenate all selected samples
-    if selected_list:
-        final_samples = pd.concat(selected_list, ignore_index=True)
+    # Gather all selected samples in one go
+    if selected_index:
+        final_samples = samples_df.loc[np.concatenate(selected_index)].reset_index(drop=True)
     else:
         final_samples = pd.DataFrame(columns=samples_df.columns)
 
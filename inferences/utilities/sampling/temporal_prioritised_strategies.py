@@ -1,343 +1,42 @@
 from inferences.utilities.sampling.temporal_allocation import uniform_sample_temporal_allocation, uniform_case_temporal_allocation, even_temporal_allocation
 from inferences.utilities.sampling.spatial_sampling import weighted_spatial_sampling
+from functools import partial
 import pandas as pd
 
 
-# (Temporal, Spatial) = (US, US)
-def tUS_sUS_draw(
-        case_incidence: dict,
-        samples_df: pd.DataFrame,
-        time_range: tuple = None,
-        target_proportion: float = None,
-        target_number: int = None,
-        min_number_per_day: int = 0,
-        target_demes: list = None,
-        random_state: int = 42
-    ) -> pd.DataFrame:
-
-    # Temporal allocation by US
-    temporal_allocation = uniform_sample_temporal_allocation(
-        case_incidence,
-        samples_df,
-        time_range=time_range,
-        target_proportion=target_proportion,
-        target_number=target_number,
-        min_number_per_day=min_number_per_day,
-        target_demes=target_demes
-    )
-
-    # Spatial sampling by US
-    samples_drawn_df = weighted_spatial_sampling(
-        temporal_allocation,
-        samples_df,
-        target_demes=target_demes,
-        weighting_strategy="samples",
-        random_state=random_state
-    )
-
-    return samples_drawn_df
-
-
-# (Temporal, Spatial) = (US, UC)
-def tUS_sUC_draw(
-        case_incidence: dict,
-        samples_df: pd.DataFrame,
-        time_range: tuple = None,
-        target_proportion: float = None,
-        target_number: int = None,
-        min_number_per_day: int = 0,
-        target_demes: list = None,
-        random_state: int = 42
-    ) -> pd.DataFrame:
-
-    # Temporal allocation by US
-    temporal_allocation = uniform_sample_temporal_allocation(
-        case_incidence,
-        samples_df,
-        time_range=time_range,
-        target_proportion=target_proportion,
-        target_number=target_number,
-        min_number_per_day=min_number_per_day,
-        target_demes=target_demes
-    )
-
-    # Spatial sampling by UC
-    samples_drawn_df = weighted_spatial_sampling(
-        temporal_allocation,
-        samples_df,
-        case_incidence=case_incidence,
-        target_demes=target_demes,
-        weighting_strategy="cases",
-        random_state=random_state
-    )
-
-    return samples_drawn_df
-
-
-# (Temporal, Spatial) = (US, UP)
-def tUS_sUP_draw(
-        case_incidence: dict,
-        samples_df: pd.DataFrame,
-        population_sizes: dict,
-        time_range: tuple = None,
-        target_proportion: float = None,
-        target_number: int = None,
-        min_number_per_day: int = 0,
-        target_demes: list = None,
-        random_state: int = 42
-    ) -> pd.DataFrame:
-
-    # Temporal allocation by US
-    temporal_allocation = uniform_sample_temporal_allocation(
-        case_incidence,
-        samples_df,
-        time_range=time_range,
-        target_proportion=target_proportion,
-        target_number=target_number,
-        min_number_per_day=min_number_per_day,
-        target_demes=target_demes
-    )
-
-    # Spatial sampling by UP
-    samples_drawn_df = weighted_spatial_sampling(
-        temporal_allocation,
-        samples_df,
-        population_sizes=population_sizes,
-        target_demes=target_demes,
-        weighting_strategy="population",
-        random_state=random_state
-    )
-
-    return samples_drawn_df
-
-
-# (Temporal, Spatial) = (US, EV)
-def tUS_sEV_draw(
-        case_incidence: dict,
-        samples_df: pd.DataFrame,
-        time_range: tuple = None,
-        target_proportion: float = None,
-        target_number: int = None,
-        min_number_per_day: int = 0,
-        target_demes: list = None,
-        random_state: int = 42
-    ) -> pd.DataFrame:
-
-    # Temporal allocation by US
-    temporal_allocation = uniform_sample_temporal_allocation(
-        case_incidence,
-        samples_df,
-        time_range=time_range,
-        target_proportion=target_proportion,
-        target_number=target_number,
-        min_number_per_day=min_number_per_day,
-        target_demes=target_demes
-    )
-
-    # Spatial sampling by EV
-    samples_drawn_df = weighted_spatial_sampling(
-        temporal_allocation,
-        samples_df,
-        target_demes=target_demes,
-        weighting_strategy="even",
-        random_state=random_state
-    )
-
-    return samples_drawn_df
-
-
-# (Temporal, Spatial) = (UC, US)
-def tUC_sUS_draw(
-        case_incidence: dict,
-        samples_df: pd.DataFrame,
-        time_range: tuple = None,
-        target_proportion: float = None,
-        target_number: int = None,
-        min_number_per_day: int = 0,
-        target_demes: list = None,
-        random_state: int = 42
-    ) -> pd.DataFrame:
-
-    # Temporal allocation by UC
-    temporal_allocation = uniform_case_temporal_allocation(
-        case_incidence,
-        samples_df,
-        time_range=time_range,
-        target_proportion=target_proportion,
-        target_number=target_number,
-        min_number_per_day=min_number_per_day,
-        target_demes=target_demes
-    )
-
-    # Spatial sampling by US
-    samples_drawn_df = weighted_spatial_sampling(
-        temporal_allocation,
-        samples_df,
-        target_demes=target_demes,
-        weighting_strategy="samples",
-        random_state=random_state
-    )
-
-    return samples_drawn_df
-
-
-# (Temporal, Spatial) = (UC, UC)
-def tUC_sUC_draw(
-        case_incidence: dict,
-        samples_df: pd.DataFrame,
-        time_range: tuple = None,
-        target_proportion: float = None,
-        target_number: int = None,
-        min_number_per_day: int = 0,
-        target_demes: list = None,
-        random_state: int = 42
-    ) -> pd.DataFrame:
-
-    # Temporal allocation by UC
-    temporal_allocation = uniform_case_temporal_allocation(
-        case_incidence,
-        samples_df,
-        time_range=time_range,
-        target_proportion=target_proportion,
-        target_number=target_number,
-        min_number_per_day=min_number_per_day,
-        target_demes=target_demes
-    )
-
-    # Spatial sampling by UC
-    samples_drawn_df = weighted_spatial_sampling(
-        temporal_allocation,
-        samples_df,
-        case_incidence=case_incidence,
-        target_demes=target_demes,
-        weighting_strategy="cases",
-        random_state=random_state
-    )
-
-    return samples_drawn_df
-
-
-# (Temporal, Spatial) = (UC, UP)
-def tUC_sUP_draw(
-        case_incidence: dict,
-        samples_df: pd.DataFrame,
-        population_sizes: dict,
-        time_range: tuple = None,
-        target_proportion: float = None,
-        target_number: int = None,
-        min_number_per_day: int = 0,
-        target_demes: list = None,
-        random_state: int = 42
-    ) -> pd.DataFrame:
-
-    # Temporal allocation by UC
-    temporal_allocation = uniform_case_temporal_allocation(
-        case_incidence,
-        samples_df,
-        time_range=time_range,
-        target_proportion=target_proportion,
-        target_number=target_number,
-        min_number_per_day=min_number_per_day,
-        target_demes=target_demes
-    )
-
-    # Spatial sampling by UP
-    samples_drawn_df = weighted_spatial_sampling(
-        temporal_allocation,
-        samples_df,
-        population_sizes=population_sizes,
-        target_demes=target_demes,
-        weighting_strategy="population",
-        random_state=random_state
-    )
-
-    return samples_drawn_df
-
-
-# (Temporal, Spatial) = (UC, EV)
-def tUC_sEV_draw(
-        case_incidence: dict,
-        samples_df: pd.DataFrame,
-        time_range: tuple = None,
-        target_proportion: float = None,
-        target_number: int = None,
-        min_number_per_day: int = 0,
-        target_demes: list = None,
-        random_state: int = 42
-    ) -> pd.DataFrame:
-
-    # Temporal allocation by UC
-    temporal_allocation = uniform_case_temporal_allocation(
-        case_incidence,
-        samples_df,
-        time_range=time_range,
-        target_proportion=target_proportion,
-        target_number=target_number,
-        min_number_per_day=min_number_per_day,
-        target_demes=target_demes
-    )
-
-    # Spatial sampling by EV
-    samples_drawn_df = weighted_spatial_sampling(
-        temporal_allocation,
-        samples_df,
-        target_demes=target_demes,
-        weighting_strategy="even",
-        random_state=random_state
-    )
-
-    return samples_drawn_df
-
-
-# (Temporal, Spatial) = (EV, US)
-def tEV_sUS_draw(
-        case_incidence: dict,
-        samples_df: pd.DataFrame,
-        time_range: tuple = None,
-        target_proportion: float = None,
-        target_number: int = None,
-        min_number_per_day: int = 0,
-        target_demes: list = None,
-        random_state: int = 42
-    ) -> pd.DataFrame:
-
-    # Temporal allocation by EV
-    temporal_allocation = even_temporal_allocation(
-        case_incidence,
-        samples_df,
-        time_range=time_range,
-        target_proportion=target_proportion,
-        target_number=target_number,
-        min_number_per_day=min_number_per_day,
-        target_demes=target_demes
-    )
-
-    # Spatial sampling by US
-    samples_drawn_df = weighted_spatial_sampling(
-        temporal_allocation,
-        samples_df,
-        target_demes=target_demes,
-        weighting_strategy="samples",
-        random_state=random_state
-    )
+# Temporal allocation function for each temporal strategy
+TEMPORAL_ALLOCATION_FUNCTIONS = {
+    "US": uniform_sample_temporal_allocation,
+    "UC": uniform_case_temporal_allocation,
+    "EV": even_temporal_allocation,
+}
 
-    return samples_drawn_df
+# Spatial weighting strategy (see weighted_spatial_sampling) for each spatial strategy
+SPATIAL_WEIGHTING_STRATEGIES = {
+    "US": "samples",
+    "UC": "cases",
+    "UP": "population",
+    "EV": "even",
+}
 
 
-# (Temporal, Spatial) = (EV, UC)
-def tEV_sUC_draw(
+# (Temporal, Spatial) = (temporal_strategy, spatial_strategy)
+def temporal_prioritised_draw(
         case_incidence: dict,
         samples_df: pd.DataFrame,
+        population_sizes: dict = None,
         time_range: tuple = None,
         target_proportion: float = None,
         target_number: int = None,
         min_number_per_day: int = 0,
         target_demes: list = None,
-        random_state: int = 42
+        random_state: int = 42,
+        temporal_strategy: str = "UC",
+        spatial_strategy: str = "UC"
     ) -> pd.DataFrame:
 
-    # Temporal allocation by EV
-    temporal_allocation = even_temporal_allocation(
+    # Temporal allocation by temporal_strategy
+    temporal_allocation = TEMPORAL_ALLOCATION_FUNCTIONS[temporal_strategy](
         case_incidence,
         samples_df,
         time_range=time_range,
@@ -347,86 +46,34 @@ def tEV_sUC_draw(
         target_demes=target_demes
     )
 
-    # Spatial sampling by UC
+    # Spatial sampling by spatial_strategy
     samples_drawn_df = weighted_spatial_sampling(
         temporal_allocation,
         samples_df,
         case_incidence=case_incidence,
-        target_demes=target_demes,
-        weighting_strategy="cases",
-        random_state=random_state
-    )
-
-    return samples_drawn_df
-
-
-# (Temporal, Spatial) = (EV, UP)
-def tEV_sUP_draw(
-        case_incidence: dict,
-        samples_df: pd.DataFrame,
-        population_sizes: dict,
-        time_range: tuple = None,
-        target_proportion: float = None,
-        target_number: int = None,
-        min_number_per_day: int = 0,
-        target_demes: list = None,
-        random_state: int = 42
-    ) -> pd.DataFrame:
-
-    # Temporal allocation by EV
-    temporal_allocation = even_temporal_allocation(
-        case_incidence,
-        samples_df,
-        time_range=time_range,
-        target_proportion=target_proportion,
-        target_number=target_number,
-        min_number_per_day=min_number_per_day,
-        target_demes=target_demes
-    )
-
-    # Spatial sampling by UP
-    samples_drawn_df = weighted_spatial_sampling(
-        temporal_allocation,
-        samples_df,
         population_sizes=population_sizes,
         target_demes=target_demes,
-        weighting_strategy="population",
+        weighting_strategy=SPATIAL_WEIGHTING_STRATEGIES[spatial_strategy],
         random_state=random_state
     )
 
     return samples_drawn_df
 
 
-# (Temporal, Spatial) = (EV, EV)
-def tEV_sEV_draw(
-        case_incidence: dict,
-        samples_df: pd.DataFrame,
-        time_range: tuple = None,
-        target_proportion: float = None,
-        target_number: int = None,
-        min_number_per_day: int = 0,
-        target_demes: list = None,
-        random_state: int = 42
-    ) -> pd.DataFrame:
-
-    # Temporal allocation by EV
-    temporal_allocation = even_temporal_allocation(
-        case_incidence,
-        samples_df,
-        time_range=time_range,
-        target_proportion=target_proportion,
-        target_number=target_number,
-        min_number_per_day=min_number_per_day,
-        target_demes=target_demes
-    )
+# (Temporal, Spatial) = (US, *)
+tUS_sUS_draw = partial(temporal_prioritised_draw, temporal_strategy="US", spatial_strategy="US")
+tUS_sUC_draw = partial(temporal_prioritised_draw, temporal_strategy="US", spatial_strategy="UC")
+tUS_sUP_draw = partial(temporal_prioritised_draw, temporal_strategy="US", spatial_strategy="UP")
+tUS_sEV_draw = partial(temporal_prioritised_draw, temporal_strategy="US", spatial_strategy="EV")
 
-    # Spatial sampling by EV
-    samples_drawn_df = weighted_spatial_sampling(
-        temporal_allocation,
-        samples_df,
-        target_demes=target_demes,
-        weighting_strategy="even",
-        random_state=random_state
-    )
+# (Temporal, Spatial) = (UC, *)
+tUC_sUS_draw = partial(temporal_prioritised_draw, temporal_strategy="UC", spatial_strategy="US")
+tUC_sUC_draw = partial(temporal_prioritised_draw, temporal_strategy="UC", spatial_strategy="UC")
+tUC_sUP_draw = partial(temporal_prioritised_draw, temporal_strategy="UC", spatial_strategy="UP")
+tUC_sEV_draw = partial(temporal_prioritised_draw, temporal_strategy="UC", spatial_strategy="EV")
 
-    return samples_drawn_df
\ No newline at end of file
+# (Temporal, Spatial) = (EV, *)
+tEV_sUS_draw = partial(temporal_prioritised_draw, temporal_strategy="EV", spatial_strategy="US")
+tEV_sUC_draw = partial(temporal_prioritised_draw, temporal_strategy="EV", spatial_strategy="UC")
+tEV_sUP_draw = partial(temporal_prioritised_draw, temporal_strategy="EV", spatial_strategy="UP")
+tEV_sEV_draw = partial(temporal_prioritised_draw, temporal_strategy="EV", spatial_strategy="EV")
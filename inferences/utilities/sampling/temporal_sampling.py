@@ -1,7 +1,144 @@
+import heapq
 import numpy as np
 import pandas as pd
 
 
+def build_incidence_matrix(case_incidence: dict) -> tuple:
+    """
+    Convert `case_incidence` into a contiguous 2-D array, so that incidence can be looked up
+    for many (deme, day) pairs with a single fancy-index.
+
+    Parameters
+    ----------
+    case_incidence : dict
+        Dictionary keyed by deme ID (int or str). Each value is a list giving daily incidence
+        counts, e.g.: case_incidence[deme_id][time] => incidence for that deme and day.
+
+    Returns
+    -------
+    tuple(np.ndarray, dict)
+        - A float array of shape (number of demes, outbreak duration), where shorter lists
+          are padded with zeros.
+        - A dictionary mapping each (integer) deme ID to its row in the array.
+    """
+
+    deme_to_row = {int(deme): row for row, deme in enumerate(case_incidence)}
+    duration = max((len(cases) for cases in case_incidence.values()), default=0)
+    incidence_arr = np.zeros((len(deme_to_row), duration), dtype=float)
+    for row, cases in enumerate(case_incidence.values()):
+        incidence_arr[row, :len(cases)] = cases
+
+    return incidence_arr, deme_to_row
+
+
+def floyd_sample(n: int, k: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Draw `k` distinct integers uniformly from range(n) using Floyd's algorithm, which runs
+    in O(k) time and memory (rather than permuting all `n` items).
+
+    Parameters
+    ----------
+    n : int
+        Size of the population.
+    k : int
+        Number of items to draw (k <= n).
+    rng : np.random.Generator
+        Random number generator.
+
+    Returns
+    -------
+    np.ndarray
+        The selected integers (in no particular order).
+    """
+
+    selected = set()
+    for j in range(n - k, n):
+        t = int(rng.integers(0, j + 1))
+        selected.add(t if t not in selected else j)
+
+    return np.fromiter(selected, dtype=np.int64, count=k)
+
+
+def uniform_choice(n: int, k: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Draw `k` distinct integers uniformly from range(n), switching to Floyd's algorithm
+    when `k` is small relative to `n`.
+    """
+
+    if k * 20 < n:
+        return floyd_sample(n, k, rng)
+
+    return rng.choice(n, size=k, replace=False)
+
+
+def stratified_weighted_choice(
+        strata: np.ndarray,
+        strata_weights: np.ndarray,
+        size: int,
+        rng: np.random.Generator
+    ) -> np.ndarray:
+    """
+    Draw `size` items without replacement, with probability proportional to their weight,
+    when all items within the same stratum share the same weight.
+
+    This gives the same distribution as weighted sampling without replacement over the
+    individual items, but we only have to decide how many items to take from each stratum;
+    the items themselves are then drawn uniformly within each stratum.
+
+    Parameters
+    ----------
+    strata : np.ndarray
+        Integer array giving the stratum (0, ..., S-1) of each item.
+    strata_weights : np.ndarray
+        Array of length S giving the (shared) weight of the items in each stratum.
+    size : int
+        Number of items to draw.
+    rng : np.random.Generator
+        Random number generator.
+
+    Returns
+    -------
+    np.ndarray
+        Positions of the selected items.
+    """
+
+    strata_sizes = np.bincount(strata, minlength=len(strata_weights)).tolist()
+    strata_weights = np.asarray(strata_weights, dtype=float).tolist()
+
+    # Each item arrives at an exponential time with rate equal to its weight, and taking the
+    # `size` earliest arrivals is equivalent to successive weighted draws without replacement.
+    # Within a stratum the sorted arrival times can be generated one at a time (the gap before
+    # the next arrival is exponential with rate weight * remaining items), so we only need to
+    # merge one stream per stratum
+    exponentials = iter(rng.exponential(size=size + len(strata_sizes)).tolist())
+    heap = [
+        (next(exponentials) / (weight * num_items), stratum)
+        for stratum, (weight, num_items) in enumerate(zip(strata_weights, strata_sizes))
+        if weight > 0 and num_items > 0
+    ]
+    heapq.heapify(heap)
+    strata_counts = [0] * len(strata_sizes)
+    for _ in range(size):
+        if not heap:
+            raise ValueError("Fewer items with non-zero weight than the requested sample size.")
+        arrival_time, stratum = heapq.heappop(heap)
+        strata_counts[stratum] += 1
+        remaining = strata_sizes[stratum] - strata_counts[stratum]
+        if remaining > 0:
+            next_arrival = arrival_time + next(exponentials) / (strata_weights[stratum] * remaining)
+            heapq.heappush(heap, (next_arrival, stratum))
+
+    # Simple random sample of the required size within each stratum
+    order = np.argsort(strata, kind="stable")
+    offsets = np.concatenate([[0], np.cumsum(strata_sizes)])
+    selected = [
+        order[offsets[stratum] + uniform_choice(strata_sizes[stratum], count, rng)]
+        for stratum, count in enumerate(strata_counts) if count > 0
+    ]
+
+    return np.concatenate(selected) if selected else np.empty(0, dtype=int)
+
+
 def weighted_temporal_sampling(
         allocation: dict,
         samples_df: pd.DataFrame,
@@ -55,77 +192,75 @@ def weighted_temporal_sampling(
       number of picks per day may vary from run to run.
     - If a deme has zero incidence on all days but you still set a positive allocation,
       those samples will effectively get zero weights (unless you choose 'even').
+    - Since all samples from the same day (within a deme) share the same weight, the draw is
+      stratified by day: we first decide how many samples to take from each day, then pick
+      them uniformly within the day (see `stratified_weighted_choice`).
     """
 
     # Check for case_incidence if needed
     if weighting_strategy == "cases" and case_incidence is None:
         raise ValueError("Must provide `case_incidence` when weighting_strategy='cases'.")
 
-    # Filter samples_df to only those demes mentioned in allocation
+    # Convert deme keys in allocation to int (samples from other demes are skipped below)
     allocation = {int(deme): n for deme, n in allocation.items()}
-    considered_demes = set(allocation.keys())
-    working_df = samples_df[samples_df["deme"].isin(considered_demes)]
 
-    # Convert deme keys in case_incidence to int if needed
-    if case_incidence is not None:
-        case_incidence = {int(deme): cases for deme, cases in case_incidence.items()}
-
-    # Loop over the demes in the allocation dictionary
-    selected_list = []
-    for deme_id, target_n in allocation.items():
+    # Convert case_incidence to a 2-D array (one row per deme) if needed
+    if weighting_strategy == "cases":
+        incidence_arr, deme_to_row = build_incidence_matrix(case_incidence)
+
+    # Loop over the demes present in the samples (a single groupby pass instead of
+    # re-filtering the whole frame for every deme in the allocation); we only collect
+    # the row positions of the selected samples and gather them once at the end
+    all_times = samples_df["time"].to_numpy(dtype=int)
+    chosen_positions = []
+    for deme_id, positions in samples_df.groupby("deme", sort=False).indices.items():
+        target_n = allocation.get(deme_id, 0)
         if target_n <= 0:
             continue
 
-        # Subset to just this deme
-        deme_subset = working_df[working_df["deme"] == deme_id].copy()
-        if deme_subset.empty:
-            # If there are no samples for this deme, skip
+        # Each deme gets its own random stream, derived from random_state and the deme ID,
+        # so a deme's draw does not depend on which other demes are sampled (or in what order)
+        rng = np.random.default_rng(np.random.SeedSequence(random_state, spawn_key=(int(deme_id),)))
+
+        # Uniform weights ('samples'): no need to count samples per day or to stratify
+        if weighting_strategy == "samples":
+            if target_n >= len(positions):
+                chosen_positions.append(positions)
+            else:
+                chosen_positions.append(positions[uniform_choice(len(positions), target_n, rng)])
             continue
 
-        # Count how many samples each day has (for this deme)
-        deme_subset["day_count"] = deme_subset.groupby("time")["time"].transform("count")
+        # Count how many samples each day has (for this deme); days are the strata, since
+        # all samples from the same day share the same weight
+        times = all_times[positions]
+        days, day_index, day_counts = np.unique(times, return_inverse=True, return_counts=True)
 
         if weighting_strategy == "cases":
             # case_incidence[deme_id][day] / bin_count
-            def get_day_incidence(row):
-                day = row["time"]
-                return case_incidence[deme_id][day]
-
-            deme_subset["deme_incidence"] = deme_subset.apply(get_day_incidence, axis=1)
-            deme_subset["weight"] = deme_subset["deme_incidence"] / deme_subset["day_count"]
+            day_weights = incidence_arr[deme_to_row[deme_id], days] / day_counts
 
         elif weighting_strategy == "even":
             # 1 / bin_count
-            deme_subset["weight"] = 1.0 / deme_subset["day_count"]
-
-        elif weighting_strategy == "samples":
-            # 1
-            deme_subset["weight"] = 1.0
+            day_weights = 1.0 / day_counts
 
         # Sum of weights
-        total_weight = deme_subset["weight"].sum()
+        total_weight = (day_weights * day_counts).sum()
         if total_weight == 0:
             continue
 
         # If target_n >= total available for that deme, take them all
-        if target_n >= len(deme_subset):
-            selected_samples = deme_subset
+        if target_n >= len(positions):
+            chosen_positions.append(positions)
         else:
-            # Weighted sampling without replacement
-            selected_samples = deme_subset.sample(
-                n=target_n,
-                replace=False,
-                weights="weight",
-                random_state=random_state
-            )
-        
-        selected_list.append(selected_samples)
-
-    # Concatenate all selected samples
-    if selected_list:
-        final_samples = pd.concat(selected_list, ignore_index=True)
+            # Weighted sampling without replacement, stratified by day
+            idx = stratified_weighted_choice(day_index, day_weights, target_n, rng)
+            chosen_positions.append(positions[idx])
+
+    # Gather all selected samples in one go
+    if chosen_positions:
+        final_samples = samples_df.iloc[np.concatenate(chosen_positions)].reset_index(drop=True)
     else:
-        final_samples = pd.DataFrame(columns=working_df.columns)
+        final_samples = pd.DataFrame(columns=samples_df.columns)
 
     return final_samples
 
@@ -160,41 +295,17 @@ def earliest_N_by_deme_sampling(
     # Filter samples_df to only those demes mentioned in allocation (first convert to integers)
     allocation = {int(deme): n for deme, n in allocation.items()}
     considered_demes = set(allocation.keys())
-    working_df = samples_df[samples_df["deme"].isin(considered_demes)].copy()
-
-    # Add a random column to shuffle within ties
-    working_df["random"] = np.random.default_rng(random_state).random(size=len(working_df))
-
-    # Sort by deme, time, and random (to break ties randomly)
-    working_df.sort_values(by=["deme", "time", "random"], ascending=[True, True, True], inplace=True)
-    working_df.drop(columns=["random"], inplace=True)
-
-    # Loop over the demes in the allocation dictionary
-    selected_list = []
-    for deme_id, target_n in allocation.items():
-        if target_n <= 0:
-            continue
-
-        # Subset to just this deme
-        deme_subset = working_df[working_df["deme"] == deme_id]
-        if deme_subset.empty:
-            # If there are no samples for this deme, skip
-            continue
+    working_df = samples_df[samples_df["deme"].isin(considered_demes)]
 
-        # If the deme has fewer samples than target_n, take them all
-        if target_n >= len(deme_subset):
-            selected_samples = deme_subset
-        else:
-            # Just take the earliest (by time) 'target_n' samples
-            selected_samples = deme_subset.iloc[:target_n]
+    # Shuffle once, then stable-sort by deme and time (the shuffled order breaks ties randomly)
+    permutation = np.random.default_rng(random_state).permutation(len(working_df))
+    working_df = working_df.iloc[permutation].sort_values(by=["deme", "time"], kind="mergesort")
 
-        selected_list.append(selected_samples)
-
-    # Concatenate all selected samples
-    if selected_list:
-        final_samples = pd.concat(selected_list, ignore_index=True)
-    else:
-        final_samples = pd.DataFrame(columns=working_df.columns)
+    # Keep the first allocation[deme] rows of each deme (rows are already in ascending
+    # time order within each deme, so a grouped cumcount gives each row's rank)
+    rank_in_deme = working_df.groupby("deme", sort=False).cumcount().to_numpy()
+    quota = working_df["deme"].map(allocation).to_numpy()
+    final_samples = working_df[rank_in_deme < quota].reset_index(drop=True)
 
     return final_samples
 
@@ -266,29 +377,22 @@ def earliest_N_temporal_sampling(
         return df
 
     # Sort by time (ascending)
-    df_sorted = df.sort_values(by="time", ascending=True).copy()
-    df_sorted.reset_index(drop=True, inplace=True)
-    
-    # Collect earliest samples day by day until we reach target_number
-    selected_list = []
-    current_count = 0
-    for day, day_group in df_sorted.groupby("time", sort=True):
-        quota = target_number - current_count
-        if quota <= 0:
-            break
-
-        if len(day_group) <= quota:
-            # Take all from this day
-            selected_list.append(day_group)
-            current_count += len(day_group)
-        else:
-            # Randomly select only 'needed' from this day
-            selected = day_group.sample(n=quota, random_state=random_state)
-            selected_list.append(selected)
-            current_count += quota
-            break  # We've reached the target
-
-    # Concatenate results
-    final_df = pd.concat(selected_list, ignore_index=True) if selected_list else pd.DataFrame(columns=df.columns)
-    
-    return final_df
\ No newline at end of file
+    df_sorted = df.sort_values(by="time", ascending=True, kind="mergesort")
+
+    # Find the first day at which the cumulative number of samples reaches target_number;
+    # all days before it are taken in full
+    day_counts = df_sorted.groupby("time", sort=True).size().to_numpy()
+    cumulative_counts = day_counts.cumsum()
+    boundary_day = np.searchsorted(cumulative_counts, target_number)
+    num_full = cumulative_counts[boundary_day - 1] if boundary_day > 0 else 0
+
+    # Randomly select only the remaining quota from the boundary day
+    quota = target_number - num_full
+    rng = np.random.default_rng(random_state)
+    boundary_positions = num_full + rng.choice(day_counts[boundary_day], size=quota, replace=False)
+
+    # Collect the selected rows in one go
+    selected_positions = np.concatenate([np.arange(num_full), boundary_positions])
+    final_df = df_sorted.iloc[selected_positions].reset_index(drop=True)
+
+    return final_df
@@ -7,8 +7,8 @@ import { hideBin } from 'yargs/helpers';
 const yargs = _yargs(hideBin(process.argv));
 
 const options = yargs
-    .usage("Usage: -i <tree_json> -o <output_json>")
-    .option("i", { alias: "tree", describe: "input tree in json format", type: "string", demandOption: true })
+    .usage("Usage: [-i <tree_json>] (reads the tree from stdin if -i is not given)")
+    .option("i", { alias: "tree", describe: "input tree in json format (defaults to stdin)", type: "string", demandOption: false })
     .option("h", { alias: "height", describe: "target tree height", type: "number", demandOption: false, default: 1000 })
     .option("w", { alias: "width", describe: "target tree width", type: "number", demandOption: false, default: 1000 })
     .argv;
@@ -159,7 +159,8 @@ function setDisplayOrder(source) {
     _setDisplayOrder(source);
 }
 
-fs.readFile(options.tree, (err, data) => {
+// Read the input tree from file if provided, otherwise from stdin (file descriptor 0)
+fs.readFile(options.tree ?? 0, (err, data) => {
     if (err) {
         console.error(err);
         process.exit(1);
@@ -1,5 +1,5 @@
 import subprocess
-import tempfile
+import numpy as np
 import json
 import os
 
@@ -9,53 +9,49 @@ def run_d3tree(inferred_tree, reflect_xy = False):
     Function to run the D3Tree visualization tool on a tree JSON file.
     """
     def tree_to_json_dict(inferred_tree):
-        def get_attrs(node):
-            return {
+        # iterative postorder pass (children are always converted before their parent),
+        # which avoids deep recursion on large trees
+        node_json = {}
+        for node in inferred_tree.traverse('postorder'):
+            is_leaf = node.is_leaf()
+            node_json[node] = {
                 'name': node.name,
                 'brlen': node.dist,
-                'type': 'leaf' if node.is_leaf() else 'node'
+                'type': 'leaf' if is_leaf else 'node',
+                'children': [] if is_leaf else [node_json.pop(child) for child in node.children]
             }
 
-        def collect_children(node):
-            children = [collect_children(child) for child in node.children]
-            node_attrs = get_attrs(node)
-            node_attrs['children'] = children
-            return node_attrs
+        return node_json[inferred_tree]
 
-        return collect_children(inferred_tree)
-
-    # convert inferred_tree to JSON format and store as tempfile
+    # convert inferred_tree to JSON format
     tree_json = tree_to_json_dict(inferred_tree)
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=True) as tree_json_file:
-        json.dump(tree_json, tree_json_file)
-        tree_json_file.flush()  # Ensure data is written
 
-        # Build command
-        node_script = os.path.join(os.path.dirname(__file__), 'd3tree', 'index.js')
-        command = ['node', node_script, '-i', tree_json_file.name]
+    # Build command (the tree JSON is streamed to the script via stdin)
+    node_script = os.path.join(os.path.dirname(__file__), 'd3tree', 'index.js')
+    command = ['node', node_script]
 
-        # run the R script
-        result = subprocess.run(command, capture_output=True, text=True, check=True)
+    # run the js script
+    result = subprocess.run(command, input=json.dumps(tree_json, separators=(',', ':')),
+                            capture_output=True, text=True, check=True)
 
-        if result.returncode != 0:
-            raise RuntimeError("Error running js script:", result.stderr)
+    if result.returncode != 0:
+        raise RuntimeError("Error running js script:", result.stderr)
 
-        # Parse the output
-        output_json = json.loads(result.stdout)            
-        tree_xy = { node['name']: (node['x'], node['y']) for node in output_json }
+    # Parse the output
+    output_json = json.loads(result.stdout)
+    names = [node['name'] for node in output_json]
+    xy = np.array([(node['x'], node['y']) for node in output_json], dtype=float)
 
-        # Rescale x and y to be between 0 and 1
-        min_x = min(node['x'] for node in output_json)
-        min_y = min(node['y'] for node in output_json)
-        max_x = max(node['x'] for node in output_json)
-        max_y = max(node['y'] for node in output_json)
-        tree_xy = { node['name']: ((node['x'] - min_x) / (max_x - min_x), (node['y'] - min_y) / (max_y - min_y)) for node in output_json }
+    # Rescale x and y to be between 0 and 1
+    min_xy = xy.min(axis=0)
+    max_xy = xy.max(axis=0)
+    xy = (xy - min_xy) / (max_xy - min_xy)
 
     # Reflex x and y if requested
     if reflect_xy:
-        tree_xy = {
-            name: (coords[1], -coords[0]) 
-            for name, coords in tree_xy.items()
-        }
+        xy = xy[:, [1, 0]]
+        xy[:, 1] *= -1
+
+    tree_xy = dict(zip(names, map(tuple, xy.tolist())))
 
     return tree_xy
@@ -1,3 +1,22 @@
+import heapq
+
+
+def iter_removal_order(dists, parent_is_anchor):
+    """
+    Function to iterate over candidate leaves in the order in which they are considered for removal.
+    Leaves are ordered by increasing branch length (ties broken by position); leaves whose parent is an anchor node are left out.
+    The candidates are kept in a heap, so only the leaves that are actually consumed are ever ordered.
+
+    Parameters:
+        dists: list of leaf branch lengths
+        parent_is_anchor: list of booleans flagging leaves whose parent is an anchor node
+    """
+    heap = [(dist, i) for i, (dist, anchored) in enumerate(zip(dists, parent_is_anchor)) if not anchored]
+    heapq.heapify(heap)
+    while heap:
+        yield heapq.heappop(heap)[1]
+
+
 def thin_tree(tree, inferred_migratory_events, target_size, min_lineage_size=200, fuzziness=0.05, alpha=1.0):
     """
     Function to thin out an ETE3 tree with consideration of inferred transmission lineages.
@@ -7,30 +26,73 @@ def thin_tree(tree, inferred_migratory_events, target_size, min_lineage_size=200
         inferred_migratory_events: list of dictionaries for transmission lineages
         target_size: desired final number of tree leaves
         min_lineage_size: minimum lineage size to qualify for thinning
-        fuzziness: an additional thinning factor
+        fuzziness: slack on the thinning targets; each group (exterior leaves or a lineage) stops removing leaves
+                   once it is within int(0.1 * fuzziness * weighted size) of its target
         alpha: exponent to scale lineage sizes; alpha > 1 will thin larger lineages more aggressively
     """
     # get a list of all anchor nodes (i.e. origin_node and destionation_node) in the inferred_migratory_events
-    origin_nodes = [event['origin_node'] for event in inferred_migratory_events]
-    destination_nodes = [event['destination_node'] for event in inferred_migratory_events]
-    anchor_nodes = set(origin_nodes + destination_nodes + [tree.get_tree_root().name])
+    anchor_nodes = {tree.get_tree_root().name}
+    for event in inferred_migratory_events:
+        anchor_nodes.add(event['origin_node'])
+        anchor_nodes.add(event['destination_node'])
     
+    # get a dictionary of all leaves in the tree, with the leaf name as the key and the leaf object as the value,
+    # record their branch lengths, and flag leaves whose parent is an anchor node (a single traversal of the tree)
+    all_leaves = {}
+    dist_of = {}
+    is_anchor_parent = {}
+    for leaf in tree.iter_leaves():
+        all_leaves[leaf.name] = leaf
+        dist_of[leaf.name] = leaf.dist
+        is_anchor_parent[leaf.name] = leaf.up is None or leaf.up.name in anchor_nodes
+
     # get the initial tree size
-    initial_tree_size = len(tree.get_leaves())
+    initial_tree_size = len(all_leaves)
 
     # check if we need to thin the tree at all
     if initial_tree_size <= target_size:
         return tree
-    
-    # get a dictionary of all leaves in the tree, with the leaf name as the key and the leaf object as the value
-    all_leaves = {leaf.name: leaf for leaf in tree.get_leaves()}
+
+    # names of the leaves still in the tree (all_leaves itself is only used for lookups)
+    alive = set(all_leaves)
+
+    def remove_leaf(leaf):
+        parent = leaf.up
+        leaf.delete(preserve_branch_length=True)
+        # if the parent was collapsed, its remaining child now hangs from the grandparent, which may be an anchor node,
+        # and has the parent's branch length added to its own
+        for sibling in parent.children:
+            if sibling.is_leaf():
+                is_anchor_parent[sibling.name] = sibling.up.name in anchor_nodes
+                dist_of[sibling.name] = sibling.dist
+
+    def thin_group(candidate_leaves, dists, num_to_remove, epsilon):
+        # remove candidate leaves in order of increasing branch length, skipping those whose parent is an anchor node,
+        # until we're within epsilon of num_to_remove
+        # (a single pass over the leaves sorted once by branch length suffices: every candidate
+        # is either removed or skipped, so a second pass would have nothing left to consider)
+        parent_is_anchor = [is_anchor_parent[name] for name in candidate_leaves]
+        for i in iter_removal_order(dists, parent_is_anchor):
+            leaf_name = candidate_leaves[i]
+
+            # skip leaves whose parent has become an anchor node (removals can collapse parents)
+            if is_anchor_parent[leaf_name]:
+                continue
+
+            # remove the leaf
+            remove_leaf(all_leaves[leaf_name])
+            num_to_remove -= 1
+            alive.discard(leaf_name)
+
+            # break if we're close enough to our target
+            if num_to_remove <= epsilon:
+                break
 
     # identify all lineage members
-    lineage_members = set()
-    for event in inferred_migratory_events:
-        lineage_members.update(event.get('members', []))
+    lineage_members = set().union(*(event.get('members', []) for event in inferred_migratory_events))
 
     # identify leaves that are not part of any lineage
+    # (the lineage check comes first, so the 'leaf' prefix is only checked once for each exterior leaf)
     exterior_leaves = {
         name: leaf for name, leaf in all_leaves.items() 
         if name not in lineage_members and name.startswith('leaf')
@@ -43,105 +105,49 @@ def thin_tree(tree, inferred_migratory_events, target_size, min_lineage_size=200
     )
 
     # calculate the thinning target for the exterior leaves and the lineages
-    total_weighted_lineage_size = sum([event['size'] ** alpha for event in sorted_inferred_migratory_events])
-    weighted_exterior_size = len(exterior_leaves) ** alpha
+    # (alpha = 1 is the common case, where sizes are used as they are)
+    if alpha == 1.0:
+        weighted_lineage_sizes = [event['size'] for event in sorted_inferred_migratory_events]
+        weighted_exterior_size = len(exterior_leaves)
+    else:
+        weighted_lineage_sizes = [event['size'] ** alpha for event in sorted_inferred_migratory_events]
+        weighted_exterior_size = len(exterior_leaves) ** alpha
+    total_weighted_lineage_size = sum(weighted_lineage_sizes)
+
+    # nothing can be thinned if there are neither exterior leaves nor qualifying lineages
+    if total_weighted_lineage_size + weighted_exterior_size == 0:
+        return tree
+
     global_thinning_factor = (initial_tree_size - target_size) / (total_weighted_lineage_size + weighted_exterior_size)
 
     # thin the exterior leaves
     num_to_remove = int(global_thinning_factor * weighted_exterior_size)
-    # track leaves we've already evaluated but couldn't remove
-    skipped_leaves = set()
-    while num_to_remove > 0:
-        # get leaves we haven't skipped yet
-        available_leaves = {
-            name: leaf.dist 
-            for name, leaf in exterior_leaves.items()
-            if name not in skipped_leaves
-        }
-
-        if not available_leaves:
-            break
-
-        # sort leaves by branch length
-        sorted_leaves = sorted(available_leaves, key=available_leaves.get)
-
-        # flag to check if we removed any in this iteration
-        removed_any = False
-
-        for leaf_name in sorted_leaves:
-            if leaf_name not in exterior_leaves:
-                continue
-
-            leaf = exterior_leaves[leaf_name]
-
-            # skip leaves whose parent is an anchor node and mark as skipped
-            if leaf.up.name in anchor_nodes:
-                skipped_leaves.add(leaf_name)
-                continue
-
-            # remove the leaf
-            leaf.delete(preserve_branch_length=True)
-            num_to_remove -= 1
-            del exterior_leaves[leaf_name]  # remove from our tracking dictionary
-            removed_any = True
-
-            # update the master list of leaves
-            if leaf_name in all_leaves:
-                del all_leaves[leaf_name]
-
-            # break if we've reached our target
-            if num_to_remove <= 0:
-                break
-
-        # if we didn't remove any leaves in this pass, we're stuck
-        if not removed_any:
-            break
+    epsilon = int(fuzziness * weighted_exterior_size * 0.1)
+    if num_to_remove > epsilon:
+        candidate_leaves = list(exterior_leaves)
+        dists = [dist_of[name] for name in candidate_leaves]
+        thin_group(candidate_leaves, dists, num_to_remove, epsilon)
+
+    # group the remaining leaves by the lineage they belong to (lineages are disjoint)
+    leaf_to_lineage = {
+        name: i for i, lineage in enumerate(sorted_inferred_migratory_events)
+        for name in lineage['members']
+    }
+    lineage_leaves = [[] for _ in sorted_inferred_migratory_events]
+    for name in all_leaves:
+        if name in alive and name in leaf_to_lineage:
+            lineage_leaves[leaf_to_lineage[name]].append(name)
 
     # thin the lineages
-    for lineage in sorted_inferred_migratory_events:
-        num_to_remove = int(global_thinning_factor * (lineage['size'] ** alpha))
-        # track leaves we've already evaluated but couldn't remove
-        skipped_leaves = set()
-        while num_to_remove > 0:
-            # get leaves we haven't skipped yet
-            available_leaves = {
-                name: leaf.dist 
-                for name, leaf in all_leaves.items()
-                if name in lineage['members'] and name not in skipped_leaves
-            }
-
-            if not available_leaves:
-                break
-
-            # sort leaves by branch length
-            sorted_leaves = sorted(available_leaves, key=available_leaves.get)
-
-            # flag to check if we removed any in this iteration
-            removed_any = False
-
-            for leaf_name in sorted_leaves:
-                if leaf_name not in all_leaves:
-                    continue
-
-                leaf = all_leaves[leaf_name]
-
-                # skip leaves whose parent is an anchor node
-                if leaf.up.name in anchor_nodes:
-                    skipped_leaves.add(leaf_name)
-                    continue
-
-                # remove the leaf
-                leaf.delete(preserve_branch_length=True)
-                num_to_remove -= 1
-                del all_leaves[leaf_name]
-                removed_any = True
-
-                # break if we've reached our target
-                if num_to_remove <= 0:
-                    break
-
-            # if we didn't remove any leaves in this pass, we're stuck
-            if not removed_any:
-                break
-
-    return tree
\ No newline at end of file
+    # (one at a time: removals can collapse parents, which changes the branch lengths and anchor-parent
+    # flags that later removals depend on, so the lineages cannot be thinned independently)
+    for weighted_lineage_size, candidate_leaves in zip(weighted_lineage_sizes, lineage_leaves):
+        num_to_remove = int(global_thinning_factor * weighted_lineage_size)
+        epsilon = int(fuzziness * weighted_lineage_size * 0.1)
+        if num_to_remove <= epsilon:
+            continue
+
+        dists = [dist_of[name] for name in candidate_leaves]
+        thin_group(candidate_leaves, dists, num_to_remove, epsilon)
+
+    return tree
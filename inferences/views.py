@@ -3,13 +3,18 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.permissions import BasePermission
 from django.shortcuts import get_object_or_404
+from django.db.models.functions import Cast
+from django.db.models import TextField
+from django.http import HttpResponse
 from rest_framework.response import Response
 from simulations.models import Simulation
 from rest_framework.views import APIView
 from rest_framework import status
-from celery import shared_task
+from celery import shared_task, group
 from .models import Inference
+import numpy as np
 import logging
+import json
 
 logger = logging.getLogger(__name__)
 
@@ -25,25 +30,25 @@ class AllowUnauthenticatedForDemo(BasePermission):
         
         # For inference deletion, you might need to get simulation UUID from the inference
         if 'inference_uuid' in view.kwargs:
-            try:
-                from .models import Inference  # Adjust import
-                inference = Inference.objects.get(uuid=view.kwargs['inference_uuid'])
-                simulation_uuid = inference.simulation.uuid
-            except Inference.DoesNotExist:
+            # read only the simulation's keywords, joined in the same query (no model instances)
+            keywords = Inference.objects.filter(uuid=view.kwargs['inference_uuid']).values_list('simulation__keywords', flat=True).first()
+            if keywords is None:
                 return False
+            # If it's a demo simulation, allow access regardless of authentication
+            if 'demo' in keywords:
+                return True
         
         # For direct simulation access
         elif 'simulation_uuid' in view.kwargs:
             simulation_uuid = view.kwargs['simulation_uuid']
         
         if simulation_uuid:
-            try:
-                simulation = Simulation.objects.get(uuid=simulation_uuid)
-                # If it's a demo simulation, allow access regardless of authentication
-                if 'demo' in simulation.keywords:
-                    return True
-            except Simulation.DoesNotExist:
+            is_demo = Simulation.is_demo_simulation(simulation_uuid)
+            if is_demo is None:
                 return False
+            # If it's a demo simulation, allow access regardless of authentication
+            if is_demo:
+                return True
         
         # For non-demo simulations, require authentication
         return request.user and request.user.is_authenticated
@@ -82,29 +87,31 @@ class InferenceSubmission(APIView):
         if replicate_num < 1:
             return Response({"error": "'replicate_num' must be >= 1."}, status=status.HTTP_400_BAD_REQUEST)
 
-        for _ in range(replicate_num):
-            inference_serializer = InferenceSerializer(data={
-                "simulation": simulation.uuid,
-                "samples_allocation": samples_allocation.id if samples_allocation else None,
-                "head": head_inference.id,
-                "dta_method": inference_specs.get("dta_method"),
-                "note": inference_specs.get("note"),
-                "status": Inference.StatusChoices.PENDING if samples_allocation else Inference.StatusChoices.SUCCESS,
-                "random_seed": inference_specs.get("random_seed", None)
-            }, context={"request": request})
+        # Validate the inference specs once (they are shared by all replicates)
+        inference_serializer = InferenceSerializer(data={
+            "simulation": simulation.uuid,
+            "samples_allocation": samples_allocation.id if samples_allocation else None,
+            "head": head_inference.id,
+            "dta_method": inference_specs.get("dta_method"),
+            "note": inference_specs.get("note"),
+            "status": Inference.StatusChoices.PENDING if samples_allocation else Inference.StatusChoices.SUCCESS,
+            "random_seed": inference_specs.get("random_seed", None)
+        }, context={"request": request})
 
-            if not inference_serializer.is_valid():            
-                return Response(inference_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        if not inference_serializer.is_valid():            
+            return Response(inference_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-            # Save the validated Inference object
-            inference = inference_serializer.save()
+        # Save all replicates in one go
+        inferences = inference_serializer.save_replicates(replicate_num)
+        created_uuids = [inference.uuid for inference in inferences]
 
-            # Run the inference asynchronously only if sampling specs are provided
-            if samples_allocation:
-                run_inference.delay(inference.id)
+        # Run the inferences on Celery workers (never on the request thread) only if sampling specs are provided;
+        # a single group dispatch, with one task per replicate so that replicates can still run in parallel
+        if samples_allocation:
+            group(run_inference.s(inference.id) for inference in inferences).apply_async()
 
-        # Return the created inference
-        return Response({"message": "Inference created successfully.",}, status=status.HTTP_201_CREATED)
+        # Return the created inferences (their UUIDs can be used to poll get_inference_data)
+        return Response({"message": "Inference created successfully.", "uuids": created_uuids}, status=status.HTTP_201_CREATED)
 
 
 @shared_task
@@ -138,13 +145,25 @@ def run_inference(inference_id):
 @api_view(['GET'])
 @permission_classes([AllowUnauthenticatedForDemo]) # Ensure only authenticated users can access this view
 def get_inference_data(request, inference_uuid):
-    inference = get_object_or_404(Inference, uuid=inference_uuid)
+    # the inferred tree and migratory events are fixed once the inference has run and are already stored
+    # as serialized JSON, so fetch them as text (instead of decoding them only to re-encode them below)
+    inference = get_object_or_404(
+        Inference.objects.select_related("head", "simulation").defer(
+            "inferred_tree_json", "inferred_migratory_events",
+            "head__inferred_tree_json", "head__inferred_migratory_events", "head__evaluations",
+            "simulation__migratory_events", "simulation__case_incidence", "simulation__sampling_times",
+            "simulation__mobility_matrix",
+        ).annotate(
+            inferred_tree_text=Cast("inferred_tree_json", TextField()),
+            inferred_migratory_events_text=Cast("inferred_migratory_events", TextField()),
+        ),
+        uuid=inference_uuid)
 
     try:
         # get inferred (annotated) tree json
-        inferred_tree_json = inference.inferred_tree_json
+        inferred_tree_json = inference.inferred_tree_text or 'null'
         # get inferred migratory events (with transmission lineages)
-        inferred_migratory_events = inference.inferred_migratory_events
+        inferred_migratory_events = inference.inferred_migratory_events_text or 'null'
 
         # get inferred deme of inferred tree
         root_deme, root_time = inference.get_inferred_root()
@@ -152,22 +171,25 @@ def get_inference_data(request, inference_uuid):
         # get daily (current, previous, and remaining) sample counts by deme
         current_sample_counts_by_deme, previous_sample_counts_by_deme, remaining_sample_counts_by_deme = inference.get_all_sample_counts_by_deme()
 
+        # stack the daily sample counts into (demes x days) arrays
+        current_counts = np.array(list(current_sample_counts_by_deme.values()), dtype=np.int64, ndmin=2)
+        previous_counts = np.array(list(previous_sample_counts_by_deme.values()), dtype=np.int64, ndmin=2)
+        remaining_counts = np.array(list(remaining_sample_counts_by_deme.values()), dtype=np.int64, ndmin=2)
+
         # calculate total daily (drawn) sample counts
-        total_current_samples = [sum(values) for values in zip(*current_sample_counts_by_deme.values())]
+        total_current_samples = current_counts.sum(axis=0).tolist()
         # calculate total daily (drawn in previous inferences) sample counts
-        total_previous_samples = [sum(values) for values in zip(*previous_sample_counts_by_deme.values())]
+        total_previous_samples = previous_counts.sum(axis=0).tolist()
         # calculate total daily (undrawn) sample counts
-        total_remaining_samples = [sum(values) for values in zip(*remaining_sample_counts_by_deme.values())]
+        total_remaining_samples = remaining_counts.sum(axis=0).tolist()
 
         # calculate total sample number
-        total_sample_num = sum(total_current_samples) + sum(total_previous_samples)
+        total_sample_num = int(current_counts.sum() + previous_counts.sum())
 
-        return Response({
+        response_json = json.dumps({
             'uuid': inference_uuid,
             'head_uuid': inference.head.uuid if inference.head else None,
             'inference_chain': inference.inference_chain,
-            'inferred_tree': inferred_tree_json,
-            'inferred_migratory_events': inferred_migratory_events,
             'inferred_root': {
                 'deme': root_deme,
                 'time': root_time
@@ -187,7 +209,17 @@ def get_inference_data(request, inference_uuid):
                     'remaining': total_remaining_samples
                 }
             }
-        })
+        }, separators=(',', ':'))
+
+        # splice in the (already serialized) inferred tree and migratory events; HttpResponse joins the
+        # pieces into its body once (and the response keeps its Content-Length)
+        response_chunks = [
+            '{"inferred_tree":', inferred_tree_json,
+            ',"inferred_migratory_events":', inferred_migratory_events,
+            ',', response_json[1:],
+        ]
+
+        return HttpResponse(response_chunks, content_type='application/json')
     
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -196,10 +228,13 @@ def get_inference_data(request, inference_uuid):
 @api_view(['DELETE'])
 @permission_classes([IsAuthenticated])
 def delete_inference(request, inference_uuid):
-    inference = get_object_or_404(Inference, uuid=inference_uuid)
+    # only the ownership/status checks below are needed before deleting
+    inference = get_object_or_404(
+        Inference.objects.only("id", "uuid", "user_id", "status", "simulation_id"),
+        uuid=inference_uuid)
     
-    # Check if inference belongs to user
-    if inference.user != request.user:
+    # Check if inference belongs to user (compare IDs to avoid fetching the user)
+    if inference.user_id != request.user.id:
         return Response({'error': 'Not authorized to delete this inference'}, status=403)
         
     # Check if inference status allows deletion
@@ -208,7 +243,7 @@ def delete_inference(request, inference_uuid):
         
     # Check if there are any pending or running inferences that are descendants of this inference
     protected_downstream_inferences = Inference.objects.filter(
-        simulation=inference.simulation,
+        simulation_id=inference.simulation_id,
         status__in=[Inference.StatusChoices.PENDING, Inference.StatusChoices.RUNNING],
         inference_chain__contains=[inference.uuid])
 
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.19 on 2026-10-15 22:58
+
+from django.db import migrations, models
+import simulations.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulations', '0006_simulation_keywords'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simulation',
+            name='migratory_events_file',
+            field=models.FileField(blank=True, upload_to=simulations.models.upload_migratory_events_file_path),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.19 on 2026-10-15 23:00
+
+from django.db import migrations, models
+
+
+def populate_summary_counts(apps, schema_editor):
+    Simulation = apps.get_model('simulations', 'Simulation')
+    for simulation in Simulation.objects.exclude(case_incidence=None).exclude(sampling_times=None).only('uuid', 'case_incidence', 'sampling_times'):
+        simulation.deme_infected = {deme: sum(new_cases) for deme, new_cases in simulation.case_incidence.items()}
+        simulation.deme_sampled = {deme: sum(sampling_times) for deme, sampling_times in simulation.sampling_times.items()}
+        simulation.total_infected = sum(simulation.deme_infected.values())
+        simulation.total_sampled = sum(simulation.deme_sampled.values())
+        simulation.save(update_fields=['deme_infected', 'deme_sampled', 'total_infected', 'total_sampled'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulations', '0007_simulation_migratory_events_file'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simulation',
+            name='deme_infected',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='simulation',
+            name='deme_sampled',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='simulation',
+            name='total_infected',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='simulation',
+            name='total_sampled',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(populate_summary_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.19 on 2026-10-15 23:01
+
+from django.db import migrations, models
+import simulations.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulations', '0008_simulation_summary_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simulation',
+            name='samples_file',
+            field=models.FileField(blank=True, upload_to=simulations.models.upload_samples_file_path),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.19 on 2026-10-15 23:03
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulations', '0009_simulation_samples_file'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='simulation',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['keywords'], name='simulation_keywords_gin'),
+        ),
+    ]
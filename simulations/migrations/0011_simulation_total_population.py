@@ -0,0 +1,26 @@
+# Generated by Django 4.2.19 on 2026-10-15 23:05
+
+from django.db import migrations, models
+
+
+def populate_total_population(apps, schema_editor):
+    Simulation = apps.get_model('simulations', 'Simulation')
+    for simulation in Simulation.objects.exclude(populations=None).only('uuid', 'populations'):
+        simulation.total_population = sum(simulation.populations.values())
+        simulation.save(update_fields=['total_population'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulations', '0010_simulation_simulation_keywords_gin'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simulation',
+            name='total_population',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(populate_total_population, migrations.RunPython.noop),
+    ]
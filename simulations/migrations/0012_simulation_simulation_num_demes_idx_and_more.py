@@ -0,0 +1,33 @@
+# Generated by Django 4.2.19 on 2026-10-15 23:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulations', '0011_simulation_total_population'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='simulation',
+            index=models.Index(condition=models.Q(('is_complete', True)), fields=['num_demes', 'uuid'], name='simulation_num_demes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='simulation',
+            index=models.Index(condition=models.Q(('is_complete', True)), fields=['duration_days', 'uuid'], name='simulation_duration_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='simulation',
+            index=models.Index(condition=models.Q(('is_complete', True)), fields=['total_population', 'uuid'], name='simulation_population_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='simulation',
+            index=models.Index(condition=models.Q(('is_complete', True)), fields=['total_infected', 'uuid'], name='simulation_infected_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='simulation',
+            index=models.Index(condition=models.Q(('is_complete', True)), fields=['total_sampled', 'uuid'], name='simulation_sampled_idx'),
+        ),
+    ]
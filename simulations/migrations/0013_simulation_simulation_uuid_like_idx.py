@@ -0,0 +1,17 @@
+# Generated by Django 4.2.19 on 2026-10-15 23:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulations', '0012_simulation_simulation_num_demes_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='simulation',
+            index=models.Index(fields=['uuid'], name='simulation_uuid_like_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
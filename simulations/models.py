@@ -1,12 +1,19 @@
-from simulations.utilities.traj_process import get_migratory_events, get_case_incidence, get_sampling_times
+from simulations.utilities.traj_process import get_migratory_events, get_case_incidence, get_sampling_times, read_cached_trajectories
 from simulations.utilities.tree_process import read_nexus_tree, get_subsampled_tree
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.core.files.base import ContentFile
+from functools import cached_property, lru_cache
+from django.core.cache import cache
 from django.conf import settings
 from django.db.models import Q
-from django.db import models
+from django.db import models, transaction
 import pandas as pd
+import numpy as np
 import base64
-import uuid
+import json
+import csv
+import io
 import os
 
 
@@ -23,14 +30,56 @@ def upload_epi_params_file_path(instance, filename):
     return os.path.join(settings.SIMULATIONS_FOLDER, str(instance.uuid), 'epi_params.json')
 def upload_xml_file_path(instance, filename):
     return os.path.join(settings.SIMULATIONS_FOLDER, str(instance.uuid), 'run.xml')
+def upload_migratory_events_file_path(instance, filename):
+    return os.path.join(settings.SIMULATIONS_FOLDER, str(instance.uuid), 'migratory_events.npz')
+def upload_samples_file_path(instance, filename):
+    return os.path.join(settings.SIMULATIONS_FOLDER, str(instance.uuid), 'samples.npz')
 
 
 # Function to generate a short UUID
 def generate_short_uuid(length=8):
-    """Generate a short UUID by encoding a UUID4 in Base62."""
-    uuid_bytes = uuid.uuid4().bytes  # Get the raw UUID bytes
-    short_uuid = base64.urlsafe_b64encode(uuid_bytes).decode('utf-8').rstrip('=')  # Base64 encode and strip padding
-    return short_uuid[:length]
+    """Generate a short UUID by Base64-encoding 16 random bytes (as in a UUID4)."""
+    # encode the raw bytes directly (no UUID object); the first 22 characters are never padding
+    return base64.urlsafe_b64encode(os.urandom(16))[:length].decode('ascii')
+
+
+# Function to compute the rolling average of daily counts (padded with zeros on both sides)
+def get_rolling_average(counts: np.ndarray, rolling_window: int):
+    window_sums = np.cumsum(np.concatenate([[0], counts]))
+    window_sums = window_sums[rolling_window:] - window_sums[:-rolling_window]
+    return [0] * (rolling_window - 1) + (window_sums / rolling_window).tolist() + [0] * (rolling_window - 1)
+
+
+# Function to compute the rolling average of the daily counts in each row of a (deme x day) array in one pass
+def get_rolling_averages(counts: np.ndarray, rolling_window: int):
+    window_sums = np.cumsum(np.pad(counts, ((0, 0), (1, 0))), axis=1)
+    window_sums = window_sums[:, rolling_window:] - window_sums[:, :-rolling_window]
+    padding = [0] * (rolling_window - 1)
+    return [padding + averages + padding for averages in (window_sums / rolling_window).tolist()]
+
+
+# Function to read an annotated tree once per process (the mtime key makes a replaced file be re-read)
+@lru_cache(maxsize=8)
+def read_cached_nexus_tree(nexus_file: str, mtime: float):
+    return read_nexus_tree(nexus_file)
+
+
+# Function to sum daily counts per deme (all demes have the same number of days) in a single array reduction
+def get_deme_totals(counts_by_deme: dict):
+    if not counts_by_deme:
+        return {}
+    totals = np.array(list(counts_by_deme.values()), dtype=np.int64).sum(axis=1)
+    return dict(zip(counts_by_deme.keys(), totals.tolist()))
+
+
+# Function to get the cache key of the demo flag of a simulation
+def get_demo_cache_key(simulation_uuid: str):
+    return f'simulation_is_demo:{simulation_uuid}'
+
+
+# Function to get the cache key of the serialized data of a simulation
+def get_data_cache_key(simulation_uuid: str):
+    return f'simulation_data:{simulation_uuid}'
 
 
 # Model for simulated outbreaks
@@ -50,37 +99,108 @@ class Simulation(models.Model):
     mobility_matrix = models.JSONField(blank=True, null=True) # mobility matrix (i.e. number of individuals moving between each pair of demes per day)
     case_incidence = models.JSONField(blank=True, null=True) # daily case incidence data (from simulated trajectories)
     migratory_events = models.JSONField(blank=True, null=True) # migration events (from simulated trajectories)
+    total_population = models.PositiveBigIntegerField(blank=True, null=True) # total population size (from populations)
+    total_infected = models.PositiveBigIntegerField(blank=True, null=True) # total number of infected individuals (from case_incidence)
+    total_sampled = models.PositiveBigIntegerField(blank=True, null=True) # total number of sampled individuals (from sampling_times)
+    deme_infected = models.JSONField(blank=True, null=True) # number of infected individuals in each deme (from case_incidence)
+    deme_sampled = models.JSONField(blank=True, null=True) # number of sampled individuals in each deme (from sampling_times)
     populations_file = models.FileField(upload_to=upload_populations_file_path) # initial population sizes (header: deme, population)
     mobility_matrix_file = models.FileField(upload_to=upload_mobility_matrix_file_path) # mobility matrix (header: from, to, rate)
     trajectory_file = models.FileField(upload_to=upload_trajectory_file_path) # simulated trajectory data
     sampled_tree_file = models.FileField(upload_to=upload_sampled_tree_file_path) # sampled and annotated tree
     epi_params_file = models.FileField(upload_to=upload_epi_params_file_path) # Epidemiological parameters file
     xml_file = models.FileField(upload_to=upload_xml_file_path) # BEAST XML file
+    migratory_events_file = models.FileField(upload_to=upload_migratory_events_file_path, blank=True) # migration events as columnar (time, origin, destination) arrays
+    samples_file = models.FileField(upload_to=upload_samples_file_path, blank=True) # samples in the sampled tree as columnar (sample_id, time, deme) arrays
     keywords = ArrayField(models.CharField(max_length=50), default=list, blank=True) # List of keywords (e.g., demo, SIR, SEIR, SIRS, etc.)
     is_complete = models.BooleanField(default=False) # flag to indicate whether all required fields have been populated
 
+    class Meta:
+        indexes = [
+            GinIndex(fields=['keywords'], name='simulation_keywords_gin'), # for keyword search (keywords__overlap)
+            # for uuid prefix search (uuid__startswith); the primary key index cannot serve LIKE outside the C locale,
+            # and no pattern index was created when uuid was changed from a UUIDField to a CharField
+            models.Index(fields=['uuid'], name='simulation_uuid_like_idx', opclasses=['varchar_pattern_ops']),
+            # for the ordered repository listing (ordering field, uuid tiebreak), which only ever lists complete
+            # simulations, so the indexes are partial (smaller, and incomplete simulations are never indexed)
+            models.Index(fields=['num_demes', 'uuid'], name='simulation_num_demes_idx', condition=Q(is_complete=True)),
+            models.Index(fields=['duration_days', 'uuid'], name='simulation_duration_idx', condition=Q(is_complete=True)),
+            models.Index(fields=['total_population', 'uuid'], name='simulation_population_idx', condition=Q(is_complete=True)),
+            models.Index(fields=['total_infected', 'uuid'], name='simulation_infected_idx', condition=Q(is_complete=True)),
+            models.Index(fields=['total_sampled', 'uuid'], name='simulation_sampled_idx', condition=Q(is_complete=True)),
+        ]
+
     def __str__(self):
         return self.uuid
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # keywords or data may have changed, so drop the cached demo flag and data
+        cache.delete_many([get_demo_cache_key(self.uuid), get_data_cache_key(self.uuid)])
+
+    def delete(self, *args, **kwargs):
+        cache.delete_many([get_demo_cache_key(self.uuid), get_data_cache_key(self.uuid)])
+        return super().delete(*args, **kwargs)
+
+    # method to check whether a simulation is a demo simulation (cached, as this is checked on every demo request);
+    # returns None if the simulation does not exist
+    @classmethod
+    def is_demo_simulation(cls, simulation_uuid):
+        cache_key = get_demo_cache_key(simulation_uuid)
+        is_demo = cache.get(cache_key)
+        if is_demo is None:
+            # read only the keywords column (no model instance)
+            keywords = cls.objects.filter(uuid=simulation_uuid).values_list('keywords', flat=True).first()
+            if keywords is None:
+                return None
+            is_demo = 'demo' in keywords
+            cache.set(cache_key, is_demo, settings.DEMO_SIMULATION_CACHE_TIMEOUT)
+        return is_demo
     
-    # method to get total population size
+    # method to get total population size (stored by populate_summary_counts)
     def get_total_population(self):
+        if self.total_population is not None:
+            return self.total_population
         return sum(self.populations.values())
     
-    # method to get total infected individuals
+    # method to get total infected individuals (stored by populate_summary_counts)
     def get_total_infected(self):
-        return sum([sum(new_cases) for new_cases in self.case_incidence.values()])
+        if self.total_infected is not None:
+            return self.total_infected
+        return sum(self.get_deme_infected().values())
     
-    # method to get total sampled individuals
+    # method to get total sampled individuals (stored by populate_summary_counts)
     def get_total_sampled(self):
-        return sum([sum(sampling_times) for sampling_times in self.sampling_times.values()])
+        if self.total_sampled is not None:
+            return self.total_sampled
+        return sum(self.get_deme_sampled().values())
 
-    # method to get total number of infected individuals in each deme
+    # method to get total number of infected individuals in each deme (stored by populate_summary_counts)
     def get_deme_infected(self):
-        return {deme: sum(new_cases) for deme, new_cases in self.case_incidence.items()}
+        if self.deme_infected is not None:
+            return self.deme_infected
+        return get_deme_totals(self.case_incidence)
     
-    # method to get total number of sampled individuals in each deme
+    # method to get total number of sampled individuals in each deme (stored by populate_summary_counts)
     def get_deme_sampled(self):
-        return {deme: sum(sampling_times) for deme, sampling_times in self.sampling_times.items()}
+        if self.deme_sampled is not None:
+            return self.deme_sampled
+        return get_deme_totals(self.sampling_times)
+
+    # method to populate total population and total/deme infected and sampled counts from populations,
+    # case_incidence and sampling_times, so that they are not recomputed from the JSON fields on every request
+    def populate_summary_counts(self, commit: bool = True):
+        # make sure that populations, case_incidence and sampling_times have been populated
+        assert self.populations, "Aborting: populations have not been populated"
+        assert self.case_incidence, "Aborting: case_incidence has not been populated"
+        assert self.sampling_times, "Aborting: sampling_times has not been populated"
+        self.total_population = sum(self.populations.values())
+        self.deme_infected = get_deme_totals(self.case_incidence)
+        self.deme_sampled = get_deme_totals(self.sampling_times)
+        self.total_infected = sum(self.deme_infected.values())
+        self.total_sampled = sum(self.deme_sampled.values())
+        if commit:
+            self.save()
 
     # method to add a keyword to the list of keywords
     def add_keyword(self, keyword):
@@ -95,70 +215,109 @@ class Simulation(models.Model):
             self.save()
 
     # method to populate epi_params from epi_params_file
-    def populate_epi_params(self):
-        epi_params = pd.read_json(self.epi_params_file.path, typ='series')
+    def populate_epi_params(self, commit: bool = True):
+        with open(self.epi_params_file.path) as epi_params_file:
+            epi_params = json.load(epi_params_file)
         self.outbreak_origin = epi_params['outbreak_origin']
         self.gamma = epi_params['gamma']
-        self.save()
+        if commit:
+            self.save()
 
     # method to populate num_demes from populations
-    def populate_num_demes(self):
+    def populate_num_demes(self, commit: bool = True):
         # make sure that populations is not empty
         assert self.populations, "Aborting: populations have not been populated"
         self.num_demes = len(self.populations)
-        self.save()
+        if commit:
+            self.save()
 
     # method to populate duration_days from case_incidence
-    def populate_duration_days(self):
+    def populate_duration_days(self, commit: bool = True):
         # make sure that case_incidence is not empty
         assert self.case_incidence, "Aborting: case_incidence has not been populated"
         self.duration_days = len(list(self.case_incidence.values())[0])
-        self.save()
+        if commit:
+            self.save()
 
     # method to extract/populate populations from populations_file
-    def populate_populations(self, save: bool = True):
-        populations = pd.read_csv(self.populations_file.path, sep='\t')
-        if save: # save population data (as a dictionary) to database
-            self.populations = populations.set_index('deme')['population'].to_dict()
-            self.save()
+    def populate_populations(self, save: bool = True, commit: bool = True):
+        if save: # save population data (as a dictionary) to database (parsed with csv, no DataFrame needed)
+            with open(self.populations_file.path, newline='') as populations_file:
+                self.populations = {int(row['deme']): int(row['population'])
+                                    for row in csv.DictReader(populations_file, delimiter='\t')}
+            self.__dict__.pop('mobility_graph', None) # invalidate cached mobility graph
+            if commit:
+                self.save()
         else:
-            return populations
+            return pd.read_csv(self.populations_file.path, sep='\t')
         
     # method to extract/populate sampled_populations from trajectory_file
-    def populate_sampling_times(self, save: bool = True):
+    def populate_sampling_times(self, save: bool = True, commit: bool = True):
         if save: # save sampling rates (as a dictionary) to database
             self.sampling_times = get_sampling_times(self.trajectory_file.path, format='dict')
-            self.save()
+            if commit:
+                self.save()
         else:
             return get_sampling_times(self.trajectory_file.path, format='dataframe')
     
     # method to extract/populate mobility_matrix from mobility_matrix_file
-    def populate_mobility_matrix(self, save: bool = True):
-        mobility_matrix = pd.read_csv(self.mobility_matrix_file.path, sep='\t')
-        if save: # save mobility matrix (as a list of tuples) to database
-            self.mobility_matrix = [tuple(row) for row in mobility_matrix.itertuples(index=False, name=None)]
-            self.save()
+    def populate_mobility_matrix(self, save: bool = True, commit: bool = True):
+        if save: # save mobility matrix (as a list of tuples) to database (parsed with csv, no DataFrame needed)
+            with open(self.mobility_matrix_file.path, newline='') as mobility_matrix_file:
+                rows = csv.reader(mobility_matrix_file, delimiter='\t')
+                next(rows) # skip header (from, to, rate)
+                self.mobility_matrix = [(int(source), int(destination), float(rate)) for source, destination, rate in filter(None, rows)]
+            self.__dict__.pop('mobility_graph', None) # invalidate cached mobility graph
+            if commit:
+                self.save()
         else:
-            return mobility_matrix
+            return pd.read_csv(self.mobility_matrix_file.path, sep='\t')
 
     # method to extract/populate case_incidence from trajectory_file
-    def populate_case_incidence(self, save: bool = True):
+    def populate_case_incidence(self, save: bool = True, commit: bool = True):
         if save: # save case incidence data (as a dictionary) to database
             self.case_incidence = get_case_incidence(self.trajectory_file.path, format='dict')
-            self.save()
+            if commit:
+                self.save()
         else:
             return get_case_incidence(self.trajectory_file.path, format='dataframe')
 
-    # method to extract/populate migratory_events from trajectory_file
-    def populate_migratory_events(self, save: bool = True):
-        if save: # save migration events (as a list) to database
+    # method to extract/populate migratory_events (and migratory_events_file) from trajectory_file
+    def populate_migratory_events(self, save: bool = True, commit: bool = True):
+        if save: # save migration events (as a list) to database, and as columnar arrays to file
             self.migratory_events = get_migratory_events(self.trajectory_file.path, format='list')
-            self.save()
+            self.save_migratory_events_file()
+            if commit:
+                self.save()
         else:
             return get_migratory_events(self.trajectory_file.path, format='dataframe')
 
-    # method to transform mobility matrix into nodes/links format from mobility_matrix
-    def get_mobility_graph(self):
+    # method to write migratory_events to migratory_events_file as (time, origin, destination) arrays
+    def save_migratory_events_file(self):
+        events = np.asarray(self.migratory_events, dtype=float).reshape(-1, 3)
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer,
+                            time=events[:, 0],
+                            origin=events[:, 1].astype(np.int32),
+                            destination=events[:, 2].astype(np.int32))
+
+        # replace any existing file (otherwise the storage backend would pick a new name)
+        if self.migratory_events_file:
+            self.migratory_events_file.delete(save=False)
+        self.migratory_events_file.save('migratory_events.npz', ContentFile(buffer.getvalue()), save=False)
+
+    # method to get migratory events as (time, origin, destination) arrays, read from migratory_events_file
+    # if available (avoids decoding the migratory_events JSON, which can then be deferred), else from migratory_events
+    def get_migratory_events_arrays(self):
+        if self.migratory_events_file:
+            with np.load(self.migratory_events_file.path) as events:
+                return events['time'], events['origin'], events['destination']
+        events = np.asarray(self.migratory_events or [], dtype=float).reshape(-1, 3)
+        return events[:, 0], events[:, 1].astype(np.int32), events[:, 2].astype(np.int32)
+
+    # nodes/links representation of populations and mobility_matrix, built once per instance
+    @cached_property
+    def mobility_graph(self):
         # make sure that both populations and mobility matrix have been populated
         assert self.populations, "Aborting: populations have not been populated"
         assert self.mobility_matrix, "Aborting: mobility_matrix has not been populated"
@@ -166,6 +325,10 @@ class Simulation(models.Model):
         links = [{'source': i, 'target': j, 'value': rate} for i, j, rate in self.mobility_matrix]
         return {'nodes': nodes, 'links': links}
 
+    # method to transform mobility matrix into nodes/links format from mobility_matrix
+    def get_mobility_graph(self):
+        return self.mobility_graph
+
     # method to check that all required files have been specified
     def check_files(self):
         return all([self.populations_file,
@@ -175,32 +338,41 @@ class Simulation(models.Model):
                     self.epi_params_file,
                     self.xml_file])
     
-    # method to populate all fields based on uploaded files
+    # method to populate all fields based on uploaded files (in a single UPDATE)
     def populate_all(self):
-        self.populate_epi_params()
-        self.populate_populations()
-        self.populate_mobility_matrix()
-        self.populate_case_incidence()
-        self.populate_sampling_times()
-        self.populate_migratory_events()
-        self.populate_num_demes()
-        self.populate_duration_days()
-        self.save()
+        try:
+            with transaction.atomic():
+                self.populate_epi_params(commit=False)
+                self.populate_populations(commit=False)
+                self.populate_mobility_matrix(commit=False)
+                self.populate_case_incidence(commit=False)
+                self.populate_sampling_times(commit=False)
+                self.populate_migratory_events(commit=False)
+                self.populate_num_demes(commit=False)
+                self.populate_duration_days(commit=False)
+                self.populate_summary_counts(commit=False)
+                self.save_samples_file()
+                self.save()
+        finally:
+            # release the parsed trajectory shared by the extractors (also if a step failed, so that it is not
+            # kept for the life of the process)
+            read_cached_trajectories.cache_clear()
 
     # method to check that all required fields have been populated
     def check_complete(self, save: bool = True):
+        # short-circuits on the first missing field (so later, possibly deferred, fields are not loaded)
         is_complete = all(
-            field is not None for field in [
-                self.num_demes,
-                self.duration_days,
-                self.outbreak_origin,
-                self.gamma,
-                self.populations,
-                self.mobility_matrix,
-                self.case_incidence,
-                self.sampling_times,
-                self.migratory_events
-                ])
+            getattr(self, field_name) is not None for field_name in (
+                'num_demes',
+                'duration_days',
+                'outbreak_origin',
+                'gamma',
+                'populations',
+                'mobility_matrix',
+                'case_incidence',
+                'sampling_times',
+                'migratory_events',
+                ))
         if save:
             self.is_complete = is_complete
             self.save()
@@ -209,81 +381,117 @@ class Simulation(models.Model):
     # method to read annotated tree from sampled_tree_file as an ETE3 Tree object
     def read_sampled_tree(self):
         return read_nexus_tree(self.sampled_tree_file.path)
+
+    # annotated tree read from sampled_tree_file, parsed once per process (shared, must not be modified in place)
+    @cached_property
+    def sampled_tree(self):
+        path = self.sampled_tree_file.path
+        return read_cached_nexus_tree(path, os.path.getmtime(path))
     
+    # method to write the samples in the sampled tree to samples_file as (sample_id, time, deme) arrays
+    def save_samples_file(self):
+        leaves = list(self.sampled_tree.iter_leaves())
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer,
+                            sample_id=np.array([leaf.name for leaf in leaves], dtype=str),
+                            time=np.array([leaf.time for leaf in leaves], dtype=float),
+                            deme=np.array([leaf.deme for leaf in leaves], dtype=np.int32))
+
+        # replace any existing file (otherwise the storage backend would pick a new name)
+        if self.samples_file:
+            self.samples_file.delete(save=False)
+        self.samples_file.save('samples.npz', ContentFile(buffer.getvalue()), save=False)
+
+    # method to get the samples in the sampled tree as (sample_id, time, deme) arrays, read from samples_file
+    # if available (avoids parsing the tree), else from the sampled tree
+    def get_samples_arrays(self):
+        if self.samples_file:
+            with np.load(self.samples_file.path) as samples:
+                return samples['sample_id'], samples['time'], samples['deme']
+        leaves = list(self.sampled_tree.iter_leaves())
+        return (np.array([leaf.name for leaf in leaves], dtype=str),
+                np.array([leaf.time for leaf in leaves], dtype=float),
+                np.array([leaf.deme for leaf in leaves], dtype=np.int32))
+
     # method to get the IDs of all samples and their sampling (time, deme) from the sampled tree as a DataFrame (default) or a dictionary
     def get_samples(self, format: str = 'dataframe', by_day: bool = False):
-        tree = self.read_sampled_tree()
-        # extract leaf nodes with sampling time and deme
-        samples_data = {leaf.name: {
-            'time': int(leaf.time) if by_day else leaf.time,
-            'deme': int(leaf.deme)
-            } for leaf in tree.iter_leaves()}
+        sample_ids, times, demes = self.get_samples_arrays()
+        if by_day:
+            times = times.astype(int)
         if format == 'dataframe':
-            df = pd.DataFrame(samples_data).T.astype({'deme': int}).reset_index()
-            df.columns = ['sample_id', 'time', 'deme']
-            return df
-        return samples_data
+            return pd.DataFrame({'sample_id': sample_ids.astype(object),
+                                 'time': times,
+                                 'deme': demes.astype(int)})
+        return {sample_id: {'time': time, 'deme': deme}
+                for sample_id, time, deme in zip(sample_ids.tolist(), times.tolist(), demes.tolist())}
     
     # method to subsample the full tree given a list of sample IDs
     def subsample_tree(self, sample_ids: list = None, deannotate_tree: bool = True, extract_attributes: bool = False, attributes_format: str = 'dataframe'):
-        tree = self.read_sampled_tree()
+        # the tree is shared (cached per process), so it must only be read: get_subsampled_tree builds new nodes
+        # for the subsampled tree and never modifies the tree it is given
+        tree = self.sampled_tree
         return get_subsampled_tree(tree, sample_ids=sample_ids,
                                    deannotate_tree=deannotate_tree,
                                    extract_attributes=extract_attributes,
                                    attributes_format=attributes_format)
     
     # method to get inference-tree
-    def get_inference_tree(self, user=None):
-        # If a user is provided, include inferences where either the user matches 
-        # or the inference is the root (head is None).
-        qs = self.inference_set.values("id", "uuid", "head_id", "dta_method", "user_id")
-        if user:
-            qs = qs.filter(Q(user=user) | Q(head__isnull=True))
-        
-        # Retrieve all relevant inferences in one query.
-        inferences = list(qs)
+    def get_inference_tree(self, user=None, inferences=None):
+        # Inferences already fetched by the caller (dicts with id, uuid, head_id and dta_method, filtered
+        # as below) can be passed in to build the tree without another query.
+        if inferences is None:
+            # If a user is provided, include inferences where either the user matches 
+            # or the inference is the root (head is None).
+            qs = self.inference_set.values("id", "uuid", "head_id", "dta_method")
+            if user:
+                qs = qs.filter(Q(user=user) | Q(head__isnull=True))
+            
+            # Retrieve all relevant inferences in one query.
+            inferences = list(qs)
         
-        # Group children by their parent id.
-        children_by_parent = {}
+        # Build a node for every inference, then attach each node to its parent's
+        # children in a single pass (no recursion, children keep the query order).
+        nodes = {inference["id"]: {
+            'uuid': inference["uuid"],
+            'children': [],
+            'is_checkpoint': inference["dta_method"] is None,
+            } for inference in inferences}
+        root_inference = None
         for inference in inferences:
             parent_id = inference['head_id']  # head is None for the root inference.
-            children_by_parent.setdefault(parent_id, []).append(inference)
+            if parent_id is None:
+                if root_inference is None:
+                    root_inference = inference
+            elif parent_id in nodes:
+                nodes[parent_id]['children'].append(nodes[inference["id"]])
         
         # Find the root inference (head is None).
-        root_inferences = children_by_parent.get(None)
-        if not root_inferences:
+        if root_inference is None:
             return None
-        root_inference = root_inferences[0]
-        
-        # Recursive function to build the tree.
-        def build_tree(parent_id):
-            tree = []
-            for node in children_by_parent.get(parent_id, []):
-                tree.append({
-                    'uuid': node["uuid"],
-                    'children': build_tree(node["id"]),
-                    'is_checkpoint': node["dta_method"] is None,
-                })
-            return tree
         
-        tree_dict = {
-            'uuid': root_inference["uuid"],
-            'children': build_tree(root_inference["id"]),
-            'is_checkpoint': root_inference["dta_method"] is None,
-        }
-        
-        return tree_dict
+        return nodes[root_inference["id"]]
     
     # method to get the uuid of the  most N recent inferences
-    def get_recent_inferences(self, user=None, N=3):
+    # (picked in memory from inferences already fetched by the caller, as dicts with uuid, user_id and created_at, if given)
+    def get_recent_inferences(self, user=None, N=3, inferences=None):
+        if inferences is not None:
+            if user:
+                inferences = [inference for inference in inferences if inference['user_id'] == user.id]
+            inferences = sorted(inferences, key=lambda inference: inference['created_at'], reverse=True)
+            return [inference['uuid'] for inference in inferences[:N]]
         if user:
             return self.inference_set.filter(user=user).order_by('-created_at').values_list('uuid', flat=True)[:N]
         return self.inference_set.order_by('-created_at').values_list('uuid', flat=True)[:N]
 
     # method to get counts of true migratory events (either importation or exportation) for each deme
     def get_migratory_event_counts(self, demes: list = None, event_type: str = 'import', rolling_window: int = 1):
-        # make sure that migratory events have been populated
-        assert self.migratory_events, "Aborting: migratory_events have not been populated"
+        return self.get_migratory_event_counts_by_window(demes=demes, event_type=event_type, rolling_windows=[rolling_window])[rolling_window]
+
+    # method to get migratory events with their (integer) days, keeping only events within the simulation duration
+    def get_migratory_event_days(self, demes: list = None, event_type: str = 'import'):
+        # get migratory events and make sure that they have been populated
+        times, origins, destinations = self.get_migratory_events_arrays()
+        assert len(times) > 0, "Aborting: migratory_events have not been populated"
         # make sure that demes provided is valid
         assert demes is None or all([str(deme) in self.populations for deme in demes]), "Aborting: invalid deme ID provided"
         # make sure that event_type is valid
@@ -291,63 +499,75 @@ class Simulation(models.Model):
         # if 'transfer', make sure that two demes are provided
         assert event_type != 'transfer' or len(demes) == 2, "Aborting: two demes must be provided for transfer events"
 
+        # convert event times to (integer) days
+        in_range = times < self.duration_days
+        return times[in_range].astype(int), origins[in_range], destinations[in_range]
+
+    # method to get counts of true migratory events (either importation or exportation) as a (deme x day) array,
+    # with one row per requested deme (returned alongside the array, in the order of populations)
+    def get_migratory_event_count_matrix(self, demes: list = None, event_type: str = 'import'):
+        assert event_type in ['import', 'export'], "Aborting: invalid event type provided"
+        days, origins, destinations = self.get_migratory_event_days(demes=demes, event_type=event_type)
+
+        # only len(deme_ids) rows are allocated when demes filters to a few demes
+        event_demes = destinations if event_type == 'import' else origins
+        deme_ids = [int(deme) for deme in self.populations.keys() if demes is None or int(deme) in demes]
+        row_of_deme = np.full(max(max(deme_ids, default=-1), event_demes.max(initial=-1)) + 1, -1)
+        row_of_deme[deme_ids] = np.arange(len(deme_ids))
+        event_rows = row_of_deme[event_demes]
+        is_selected = event_rows >= 0
+        all_event_counts = np.bincount(event_rows[is_selected] * self.duration_days + days[is_selected],
+                                       minlength=len(deme_ids) * self.duration_days)
+        return deme_ids, all_event_counts[:len(deme_ids) * self.duration_days].reshape(len(deme_ids), self.duration_days)
+
+    # method to get counts of true migratory events for several rolling windows at once (keyed by rolling window),
+    # counting the events only once and applying each rolling window to the same daily counts
+    def get_migratory_event_counts_by_window(self, demes: list = None, event_type: str = 'import', rolling_windows: list = (1,)):
         # if 'transfer', get counts for deme 0 -> deme 1
         if event_type == 'transfer':
-            event_counts = [0] * self.duration_days
-            for event in self.migratory_events:
-                time, origin, destination = event
-                time_int = int(time)
+            days, origins, destinations = self.get_migratory_event_days(demes=demes, event_type=event_type)
+            is_transfer = (origins == demes[0]) & (destinations == demes[1])
+            event_counts = np.bincount(days[is_transfer], minlength=self.duration_days)[:self.duration_days]
 
-                if origin == demes[0] and destination == demes[1]:
-                    event_counts[time_int] += 1
-
-            # apply rolling window
-            if rolling_window > 1:
-                event_counts = [0] * (rolling_window - 1) + [sum(event_counts[i:i+rolling_window]) / rolling_window for i in range(self.duration_days - rolling_window + 1)] + [0] * (rolling_window - 1)
-
-            return event_counts
+            # apply rolling windows
+            return { rolling_window: get_rolling_average(event_counts, rolling_window) if rolling_window > 1 else event_counts.tolist()
+                     for rolling_window in rolling_windows }
         
-        # if 'import' or 'export', get counts for each deme
-        event_counts = { int(deme): [0] * self.duration_days for deme in self.populations.keys() if demes is None or int(deme) in demes }
-        for event in self.migratory_events:
-            time, origin, destination = event
-            time_int = int(time)
-
-            if event_type == 'import' and destination in event_counts:
-                event_counts[destination][time_int] += 1
-            elif event_type == 'export' and origin in event_counts:
-                event_counts[origin][time_int] += 1 
-
-        # apply rolling window
-        if rolling_window > 1:
-            for deme, counts in event_counts.items():
-                event_counts[deme] = [0] * (rolling_window - 1) + [sum(counts[i:i+rolling_window]) / rolling_window for i in range(self.duration_days - rolling_window + 1)] + [0] * (rolling_window - 1)
-
-        return event_counts
+        # if 'import' or 'export', get counts for each requested deme (one row per requested deme, one column per day)
+        deme_ids, all_event_counts = self.get_migratory_event_count_matrix(demes=demes, event_type=event_type)
+
+        # apply rolling windows (to all requested demes at once)
+        return { rolling_window: dict(zip(deme_ids, get_rolling_averages(all_event_counts, rolling_window) if rolling_window > 1
+                                                    else all_event_counts.tolist()))
+                 for rolling_window in rolling_windows }
     
+    # method to get time and source of the earliest importation event into every deme that has at least one
+    def get_first_importations(self):
+        times, origins, destinations = self.get_migratory_events_arrays()
+
+        # sort events by destination and then time (stable, so ties keep the earliest-listed event),
+        # and take the first event for each destination
+        order = np.lexsort((times, destinations))
+        first_demes, first_positions = np.unique(destinations[order], return_index=True)
+        first_events = order[first_positions]
+
+        return { int(deme): { 'time': float(times[i]), 'source': int(origins[i]) }
+                 for deme, i in zip(first_demes, first_events) }
+
     # method to get time and source of earliest importation event for each deme
     def get_earliest_importation(self, demes: list = None):
         # make sure that migratory events have been populated
-        assert self.migratory_events, "Aborting: migratory_events have not been populated"
+        assert self.migratory_events_file or self.migratory_events, "Aborting: migratory_events have not been populated"
         # make sure that demes provided is valid
         assert demes is None or all([str(deme) in self.populations for deme in demes]), "Aborting: invalid deme ID provided"
 
-        # filter migratory events by deme, if specified
-        earliest_importations = { int(deme): { 'time': float('inf'), 'source': None }
+        # filter earliest importation events by deme, if specified (None if a deme has no importation event)
+        first_importations = self.get_first_importations()
+        earliest_importations = { int(deme): first_importations.get(int(deme), { 'time': None, 'source': None })
                                  for deme in self.populations.keys() if demes is None or int(deme) in demes }
-        for event in self.migratory_events:
-            time, origin, destination = event
-
-            if destination in earliest_importations and earliest_importations[destination]['time'] > time:
-                earliest_importations[destination] = { 'time': time, 'source': int(origin) }
-
-        # convert float(inf) to None
-        for deme, earliest_importation in earliest_importations.items():
-            if earliest_importation['time'] == float('inf'):
-                earliest_importations[deme] = { 'time': None, 'source': None }
 
         # add outbreak origin
         if self.outbreak_origin in earliest_importations:
             earliest_importations[self.outbreak_origin] = { 'time': 0, 'source': None }
 
-        return earliest_importations
\ No newline at end of file
+        return earliest_importations
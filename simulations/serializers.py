@@ -1,3 +1,4 @@
+import numpy as np
 from rest_framework import serializers
 from .models import Simulation
 
@@ -12,10 +13,11 @@ class DynamicFieldsModelSerializer(serializers.ModelSerializer):
 
         if fields is not None:
             # Drop any fields that are not specified in the `fields` argument.
+            # (with many=True this runs once for the shared child serializer, not per row)
             allowed = set(fields)
-            existing = set(self.fields)
-            for field_name in existing - allowed:
-                self.fields.pop(field_name)
+            for field_name in list(self.fields):
+                if field_name not in allowed:
+                    self.fields.pop(field_name)
 
 
 # A serializer for the Simulation model
@@ -65,10 +67,11 @@ class SimulationSerializer(DynamicFieldsModelSerializer):
     
     def get_mobility_matrix(self, obj):
         num_demes = obj.num_demes
-        matrix = [[0 for _ in range(num_demes)] for _ in range(num_demes)]
+        matrix = np.zeros((num_demes, num_demes))
 
-        # populate matrix based on the long-format data
-        for source, destination, value in obj.mobility_matrix:
-            matrix[source][destination] = value
+        # populate matrix based on the long-format data in a single scatter
+        if obj.mobility_matrix:
+            sources, destinations, values = zip(*obj.mobility_matrix)
+            matrix[list(sources), list(destinations)] = values
 
-        return matrix
\ No newline at end of file
+        return matrix.tolist()
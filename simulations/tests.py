@@ -1,3 +1,44 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from inferences.models import Inference, SamplesAllocation
+from .models import Simulation
 
-# Create your tests here.
+
+# get_inference_tree should issue a fixed number of queries, however many inferences a simulation has
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class InferenceTreeQueryCountTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user', password='password')
+        cls.demo_simulation = Simulation.objects.create(keywords=['demo'], duration_days=10)
+        cls.simulation = Simulation.objects.create(keywords=[], duration_days=10)
+
+        for simulation in (cls.demo_simulation, cls.simulation):
+            root = Inference.objects.create(simulation=simulation, user=cls.user)
+            for _ in range(5):
+                samples_allocation = SamplesAllocation.objects.create(earliest_time=0, latest_time=9)
+                Inference.objects.create(simulation=simulation, user=cls.user, head=root,
+                                         samples_allocation=samples_allocation,
+                                         dta_method=Inference.DTAInferenceMethods.TREETIME)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_demo_simulation(self):
+        # demo flag, simulation, serialized inferences, and tree/recent inferences
+        with self.assertNumQueries(4):
+            response = self.client.get(f'/simulations/get-inference-tree/{self.demo_simulation.uuid}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['tree']['children']), 5)
+
+    def test_user_simulation(self):
+        self.client.force_authenticate(user=self.user)
+        # demo flag, simulation, and inferences (shared by the serializer, tree and recent inferences)
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/simulations/get-inference-tree/{self.simulation.uuid}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['inferences']), 6)
+        self.assertEqual(len(response.data['recent_inferences']), 3)
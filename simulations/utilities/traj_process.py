@@ -1,4 +1,33 @@
+from functools import lru_cache
 import pandas as pd
+import numpy as np
+import os
+
+# column types of REMASTER trajectory files (t is logged as a float, e.g. 0.0)
+TRAJECTORY_DTYPES = {'t': 'float64', 'population': 'category', 'index': 'int64', 'value': 'int64'}
+
+
+@lru_cache(maxsize=1)
+def read_cached_trajectories(trajs_file: str, mtime: float) -> pd.DataFrame:
+    """
+    Function to read a trajectory file once for all extractors (keyed on the file's modification time,
+    so that a replaced file is re-read). The returned DataFrame is shared and must not be modified in place.
+    """
+    # population only takes a few values (e.g. S, I, R, O), so compare codes rather than strings;
+    # the other column types are declared up front so the parser does not have to infer them
+    trajs = pd.read_csv(trajs_file, sep='\t', dtype=TRAJECTORY_DTYPES)
+
+    # compute differences in value for each group of (population, index) at consecutive times
+    # (trajectories are logged in time order, so this is shared by all extractors)
+    trajs['value_diff'] = trajs.groupby(['population', 'index'], sort=False, observed=True)['value'].diff()
+    return trajs
+
+
+def read_trajectories(trajs_file: str) -> pd.DataFrame:
+    """
+    Function to read simulated trajectories (shared between calls on the same, unchanged file).
+    """
+    return read_cached_trajectories(trajs_file, os.path.getmtime(trajs_file))
 
 
 def get_migratory_events(trajs_file: str, format: str = 'dataframe'):
@@ -8,14 +37,11 @@ def get_migratory_events(trajs_file: str, format: str = 'dataframe'):
     or a list of tuples with (time, origin, destination) if format is 'list'.
     """
     # read full trajectory file
-    trajs = pd.read_csv(trajs_file, sep='\t')
-
-    # compute differences in value for each group of (population, index) at consecutive times
-    trajs['value_diff'] = trajs.groupby(['population', 'index'])['value'].diff()
+    trajs = read_trajectories(trajs_file)
 
     # find groups (by t) where diff is in [-1, 1] and that they sum to 0
     migration_trajs = trajs[(trajs.population == 'I') & (trajs.value_diff.isin([-1, 1]))]
-    migration_trajs = migration_trajs.loc[migration_trajs.groupby('t')['value_diff'].filter(lambda x: x.sum() == 0).index]
+    migration_trajs = migration_trajs[migration_trajs.groupby('t', sort=False)['value_diff'].transform('sum') == 0]
 
     # extract migration events in a vectorized manner
     origins = migration_trajs[migration_trajs['value_diff'] == -1].set_index('t')['index']
@@ -31,7 +57,10 @@ def get_migratory_events(trajs_file: str, format: str = 'dataframe'):
     if format == 'dataframe':
         return migration_events
     
-    return list(migration_events.itertuples(index=False, name=None))
+    # zip plain Python lists of each column rather than iterating over DataFrame rows
+    return list(zip(migration_events['time'].tolist(),
+                    migration_events['origin'].tolist(),
+                    migration_events['destination'].tolist()))
 
 
 def get_case_incidence(trajs_file: str, format: str = 'dataframe'):
@@ -41,18 +70,14 @@ def get_case_incidence(trajs_file: str, format: str = 'dataframe'):
     or a dictionary with deme as key and a list of new cases per day as value, where each list is of the same length (simulation duration).
     """
     # read trajectory file
-    trajs = pd.read_csv(trajs_file, sep='\t')
+    trajs = read_trajectories(trajs_file)
 
-    # filter for I and compute compute differences in value
+    # filter for I
     trajs = trajs[trajs.population == 'I'].drop(columns=['population'])
 
-    # sort the DataFrame by time.
+    # sort the DataFrame by time (value_diff is the difference in 'value' per deme, computed on read)
     trajs = trajs.sort_values('t')
 
-    # compute the difference in 'value' over the entire dataset,
-    # grouped by 'index' (i.e. per deme).
-    trajs['value_diff'] = trajs.groupby('index')['value'].diff()
-
     # handle initial cases (t=0) separately
     initial_cases = trajs[trajs.t == 0].copy()
     initial_cases = (initial_cases.groupby(['t', 'index'])
@@ -64,7 +89,7 @@ def get_case_incidence(trajs_file: str, format: str = 'dataframe'):
     trajs_later = trajs[trajs.t > 0].copy()
 
     # filter for valid incidence changes (i.e. sum(value_diff) == 1)
-    valid_times = trajs_later.groupby('t')['value_diff'].transform('sum') == 1
+    valid_times = trajs_later.groupby('t', sort=False)['value_diff'].transform('sum') == 1
     incidence_later = trajs_later[valid_times & (trajs_later['value_diff'] == 1)].astype({'t': int})
     
     # group by time and deme, count new cases
@@ -79,14 +104,14 @@ def get_case_incidence(trajs_file: str, format: str = 'dataframe'):
     if format == 'dataframe':
         return incidence
     
-    # convert to dictionary format
+    # convert to dictionary format by filling a (deme x day) array in one scatter
+    # (if a deme has both initial and later cases on day 0, the later count is kept)
     simulation_T = int(trajs.t.max())
-    incidence_dict = {}
-    for deme in trajs['index'].unique():
-        deme_dict = dict(incidence[incidence.deme == deme][['t', 'new_cases']].values)
-        incidence_dict[int(deme)] = [int(deme_dict.get(t, 0)) for t in range(simulation_T + 1)]
-
-    return incidence_dict
+    demes = trajs['index'].unique()
+    incidence = incidence.drop_duplicates(subset=['deme', 't'], keep='last')
+    incidence_arr = np.zeros((len(demes), simulation_T + 1), dtype=np.int64)
+    incidence_arr[pd.Index(demes).get_indexer(incidence.deme), incidence.t.astype(int)] = incidence.new_cases
+    return {int(deme): counts for deme, counts in zip(demes, incidence_arr.tolist())}
 
 
 def get_sampling_rate(trajs_file: str, is_global: bool = False, format: str = 'dataframe'):
@@ -96,7 +121,7 @@ def get_sampling_rate(trajs_file: str, is_global: bool = False, format: str = 'd
     If the latter, the deme-specific sampling rates are returned as either a DataFrame or a dictionary.
     """
     # read trajectory file
-    trajs = pd.read_csv(trajs_file, sep='\t')
+    trajs = read_trajectories(trajs_file)
 
     if is_global: # compute global sampling rate
         total_infected = trajs[(trajs.t == trajs.t.max()) & (trajs.population.isin(['I', 'R']))].value.sum()
@@ -104,20 +129,16 @@ def get_sampling_rate(trajs_file: str, is_global: bool = False, format: str = 'd
         return total_sampled / total_infected
     else: # compute per-deme sampling rate
         # compute total infected by deme
-        total_infected_by_deme = trajs[(trajs.t == trajs.t.max()) & (trajs.population.isin(['I', 'R']))].groupby('index').agg({'value': 'sum'}).reset_index()
+        total_infected_by_deme = trajs[(trajs.t == trajs.t.max()) & (trajs.population.isin(['I', 'R']))].groupby('index', sort=False).agg({'value': 'sum'}).reset_index()
         total_infected_by_deme = total_infected_by_deme.rename(columns={'index': 'deme', 'value': 'total_infected'})
 
-        # enumerate all sampling events
-        trajs = trajs[trajs.population.isin(['I', 'O'])].copy()
-        trajs['value_diff'] = trajs.groupby(['index', 'population'])['value'].diff()                                                                
-        sampling_events = trajs[(trajs.population == 'O') & (trajs['value_diff'] == 1)]
+        # enumerate all sampling events (filtered straight from the full frame, no intermediate I/O subset)
+        sampling_times = trajs.t[(trajs.population == 'O') & (trajs['value_diff'] == 1)]
         removal_events = trajs[(trajs.population == 'I') & (trajs['value_diff'] == -1)]
-        merged_events = sampling_events.merge(
-            removal_events,
-            on='t',
-            suffixes=('_O', '_I')
-        )
-        result = merged_events[['t', 'index_I']].rename(columns={'index_I': 'deme'})
+        # each sampling event (O + 1) coincides with exactly one removal (I - 1) in the sampled deme,
+        # so keep the removals at sampling times (semi-join) instead of merging the two tables
+        sampled_removals = removal_events[removal_events.t.isin(sampling_times)]
+        result = sampled_removals[['t', 'index']].rename(columns={'index': 'deme'})
         result = result.deme.value_counts().to_frame().reset_index()
 
         # merge with initial populations
@@ -136,32 +157,28 @@ def get_sampling_times(trajs_file: str, is_global: bool = False, format: str = '
     If the earlier, the sampling times are returned as a list; if the latter, either as a DataFrame or a dictionary of lists.
     """
     # read trajectory file
-    trajs = pd.read_csv(trajs_file, sep='\t')
+    trajs = read_trajectories(trajs_file)
     
     if is_global: # compute global sampling times
         sampling_entries = trajs[trajs.population == 'O']
-        sampling_counts = sampling_entries[sampling_entries.value.diff() == 1].t.astype(int).value_counts().sort_index().to_dict()
-        sampling_counts_filled = [sampling_counts.get(t, 0) for t in range(int(trajs.t.max()) + 1)]
-        return sampling_counts_filled
+        sampling_days = sampling_entries[sampling_entries.value.diff() == 1].t.to_numpy().astype(np.int64)
+        # count sampling events per day (including days without any)
+        return np.bincount(sampling_days, minlength=int(trajs.t.max()) + 1).tolist()
     else: # compute per-deme sampling times
-        trajs = trajs[trajs.population.isin(['I', 'O'])].copy()
-        trajs['value_diff'] = trajs.groupby(['index', 'population'])['value'].diff()                                                                
-        sampling_events = trajs[(trajs.population == 'O') & (trajs['value_diff'] == 1)]
+        # enumerate all sampling events (filtered straight from the full frame, no intermediate I/O subset)
+        sampling_times = trajs.t[(trajs.population == 'O') & (trajs['value_diff'] == 1)]
         removal_events = trajs[(trajs.population == 'I') & (trajs['value_diff'] == -1)]
-        merged_events = sampling_events.merge(
-            removal_events,
-            on='t',
-            suffixes=('_O', '_I')
-        )
-        result = merged_events[['t', 'index_I']].rename(columns={'index_I': 'deme'}).astype({'t': int})
+        # each sampling event (O + 1) coincides with exactly one removal (I - 1) in the sampled deme,
+        # so keep the removals at sampling times (semi-join) instead of merging the two tables
+        sampled_removals = removal_events[removal_events.t.isin(sampling_times)]
+        result = sampled_removals[['t', 'index']].rename(columns={'index': 'deme'}).astype({'t': int})
         result = result.groupby(['t', 'deme']).size().reset_index(name='count')
 
         if format == 'dataframe':
             return result
         
-        sampling_counts_filled_by_deme = {}
-        for deme in trajs['index'].unique():
-            deme_counts = dict(result[result.deme == deme][['t', 'count']].values)
-            sampling_counts_filled_by_deme[int(deme)] = [int(deme_counts.get(t, 0)) for t in range(int(trajs.t.max()) + 1)]
-
-        return sampling_counts_filled_by_deme
\ No newline at end of file
+        # fill a (deme x day) array of counts in one scatter (rows of demes without samples stay zero)
+        demes = trajs.loc[trajs.population.isin(['I', 'O']), 'index'].unique()
+        sampling_counts_arr = np.zeros((len(demes), int(trajs.t.max()) + 1), dtype=np.int64)
+        sampling_counts_arr[pd.Index(demes).get_indexer(result.deme), result.t] = result['count']
+        return {int(deme): counts for deme, counts in zip(demes, sampling_counts_arr.tolist())}
\ No newline at end of file
@@ -3,6 +3,16 @@ import pandas as pd
 import re
 
 
+# regular expressions for parsing (annotated) REMASTER NEXUS trees, compiled once at import
+TRANSLATE_BLOCK_PATTERN = re.compile(r"Translate\s+(.*?);", re.DOTALL)
+TRANSLATE_ENTRY_PATTERN = re.compile(r"(\d+)\s+(\S+),")
+TREE_BLOCK_PATTERN = re.compile(r"tree\s+\S+\s*=\s*(.*);", re.DOTALL)
+NODE_PATTERN = re.compile(
+    r'(\b\d+\b)\[&type="I\{(\d+)\}",time=([\d.eE-]+)\]'                            # leaf (numeric ID followed by a comment)
+    r'|\)(?::[^,\(\)\[]+)?\[&type="I\{(\d+)\}",time=([\d.eE-]+)\](?=:[\d.eE-])'     # internal node (followed by a branch length)
+    r'|\[&type="I\{\d+\}",time=[\d.eE-]+\]')                                         # any other comment (e.g. root without branch length)
+
+
 def read_nexus_tree(nexus_file: str, remove_singletons: bool = False) -> Tree:
     """
     Function to read a (annotated) tree (from output of REMASTER) in NEXUS format and return an ETE3 (annotated) tree object.
@@ -13,58 +23,51 @@ def read_nexus_tree(nexus_file: str, remove_singletons: bool = False) -> Tree:
         nexus_str = f.read()
 
     # extract the Translate block
-    translate_match = re.search(r"Translate\s+(.*?);", nexus_str, re.DOTALL)
+    translate_match = TRANSLATE_BLOCK_PATTERN.search(nexus_str)
     translate_block = translate_match.group(1).strip()
     # create a mapping of numeric IDs to taxon names
-    translate_mapping = dict(re.findall(r"(\d+)\s+(\S+),", translate_block))
+    translate_mapping = dict(TRANSLATE_ENTRY_PATTERN.findall(translate_block))
 
     # extract the tree block
-    tree_match = re.search(r"tree\s+\S+\s*=\s*(.*);", nexus_str, re.DOTALL)
+    tree_match = TREE_BLOCK_PATTERN.search(nexus_str)
     tree_str = tree_match.group(1)
 
-    # replace numeric IDs with taxon names only when followed by a comment
-    def replace_id_with_taxon_names(match):
-        num_id = match.group(1)
-        comment = match.group(2)
-        # replace only if the ID exists in the mapping
-        if num_id in translate_mapping:
-            return f"{translate_mapping[num_id]}{comment}"
-        return match.group(0)  # leave unchanged if no mapping exists
-    
-    # replace numeric IDs with taxon names
-    labelled_tree_str = re.sub(r"(\b\d+\b)(\[\&.*?\])", replace_id_with_taxon_names, tree_str)
-
-    # add label to internal nodes
-    internal_comment_pattern = re.compile(r'(\))(?::[^,\(\)\[]+)?(\[&type="I\{\d+\}",time=[\d.eE\-]+?\]:[\d.eE\-]+)')
-    counter = 0 # counter to keep track of internal node labels
-    def add_node_labels(match):
-        nonlocal counter
-        counter += 1
-        return f"{match.group(1)}innode_{counter}{match.group(2)}"
-    internal_labelled_tree_str = internal_comment_pattern.sub(add_node_labels, labelled_tree_str)
-
-    # extract node attributes from comments
-    node_comment_pattern = re.compile(r'(leaf_\d+|innode_\d+)\[&type="I\{(\d+)\}",time=([\d.]+)\]')
+    # single pass over the tree string that (i) replaces numeric leaf IDs with taxon names, (ii) labels internal nodes
+    # (innode_1, innode_2, ... in order of appearance), (iii) collects (deme, time) node attributes from the comments,
+    # and (iv) drops the comments, writing the resulting newick string fragment by fragment
     node_attributes = {}
-    for match in node_comment_pattern.finditer(internal_labelled_tree_str):
-        node_name = match.group(1)          # leaf_xxx or innode_xxx
-        node_type = int(match.group(2))     # the integer in I{xx}
-        node_time = float(match.group(3))   # the float in time=...
-        node_attributes[node_name] = {'deme': node_type, 'time': node_time}
-
-    # remove node attributes from the tree string
-    pattern_brackets = re.compile(r'\[&type="I\{\d+\}",time=[\d.eE-]+\]')
-    # Replace each match with an empty string
-    uncommented_tree_str = pattern_brackets.sub('', internal_labelled_tree_str).replace('\nEnd', '')
+    newick_fragments = []
+    last_end = 0
+    counter = 0 # counter to keep track of internal node labels
+    for match in NODE_PATTERN.finditer(tree_str):
+        newick_fragments.append(tree_str[last_end:match.start()])
+        last_end = match.end()
+        num_id, leaf_deme, leaf_time, node_deme, node_time = match.groups()
+        if num_id is not None:
+            # replace only if the ID exists in the mapping (leave unchanged, without attributes, otherwise)
+            if num_id in translate_mapping:
+                node_name = translate_mapping[num_id]
+                node_attributes[node_name] = (int(leaf_deme), float(leaf_time))
+            else:
+                node_name = num_id
+            newick_fragments.append(node_name)
+        elif node_deme is not None:
+            counter += 1
+            node_name = f"innode_{counter}"
+            node_attributes[node_name] = (int(node_deme), float(node_time))
+            newick_fragments.append(f"){node_name}")
+    newick_fragments.append(tree_str[last_end:])
+    uncommented_tree_str = ''.join(newick_fragments).replace('\nEnd', '')
 
     # create a tree object from the newick string
     tree = Tree(uncommented_tree_str, format=1)
 
-    # add node attributes to the tree object
+    # add node attributes to the tree object (set directly, rather than through add_features(**kwargs))
     for node in tree.traverse():
-        node_name = node.name
-        if node_name in node_attributes:
-            node.add_features(**node_attributes[node_name])
+        attributes = node_attributes.get(node.name)
+        if attributes is not None:
+            node.deme, node.time = attributes
+            node.features.update(('deme', 'time'))
 
     # remove single-child nodes if requested
     if remove_singletons:
@@ -96,26 +99,47 @@ def get_subsampled_tree(
     # find the MRCA of the leaves to keep in the original tree
     mrca = tree.get_common_ancestor(sample_ids)
 
-    # make a copy of the tree
-    subsampled_tree = mrca.copy()
-    
-    # prune the copied subtree to retain only the desired leaves
-    subsampled_tree.prune(sample_ids, preserve_branch_length=True)
+    # build the pruned subtree bottom-up without copying (or modifying) the original tree: a new node is only created
+    # for the nodes that prune(sample_ids, preserve_branch_length=True) on a copy would keep (the samples, the MRCA and
+    # the branching points in between), each removed node adds its branch length to its (at most one) kept descendant,
+    # and children are ordered as prune() leaves them (kept children first, then kept descendants of removed children)
+    keep = set(sample_ids)
+    kept_nodes = {} # node -> (whether node is kept, new node if kept else kept descendants passed up)
+    for node in mrca.traverse('postorder'):
+        kept_children = []
+        passed_up = []
+        for child in node.children:
+            is_kept, kept_descendants = kept_nodes.pop(child)
+            if is_kept:
+                kept_children.append(kept_descendants)
+            else:
+                passed_up.extend(kept_descendants)
+        kept_descendants = kept_children + passed_up
+        if node is mrca or len(kept_descendants) > 1 or (node.is_leaf() and node.name in keep):
+            new_node = Tree(name=node.name, dist=node.dist, support=node.support)
+            for feature in node.features - {'name', 'dist', 'support'}:
+                new_node.add_feature(feature, getattr(node, feature))
+            for kept_descendant in kept_descendants:
+                new_node.add_child(kept_descendant)
+            kept_nodes[node] = (True, new_node)
+        else:
+            if kept_descendants:
+                kept_descendants[0].dist += node.dist
+            kept_nodes[node] = (False, kept_descendants)
+    subsampled_tree = kept_nodes[mrca][1]
     
     # Set the branch length of the new root (MRCA) to 0
     subsampled_tree.dist = 0
     
     # extract node attributes if extract_attributes is True
     if extract_attributes:
-        node_attributes = {}
-        for node in subsampled_tree.traverse():
-            node_name = node.name
-            node_attributes[node_name] = {'deme': node.deme, 'time': node.time}
-        # convert node_attributes to a DataFrame if attributes_format is 'dataframe'
+        node_attributes = {node.name: (node.deme, node.time) for node in subsampled_tree.traverse()}
+        # convert node_attributes to a DataFrame (built column-wise) if attributes_format is 'dataframe', otherwise to a dictionary
         if attributes_format == 'dataframe':
-            node_attributes = pd.DataFrame([(node_name, node_attr['deme'], node_attr['time'])
-                                            for node_name, node_attr in node_attributes.items()],
-                                            columns=['name', 'deme', 'time'])
+            demes, times = zip(*node_attributes.values())
+            node_attributes = pd.DataFrame({'name': list(node_attributes.keys()), 'deme': demes, 'time': times})
+        else:
+            node_attributes = {node_name: {'deme': deme, 'time': time} for node_name, (deme, time) in node_attributes.items()}
 
     # remove node attributes if deannotate_tree is True (for performing DTA)
     if deannotate_tree:
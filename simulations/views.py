@@ -1,15 +1,28 @@
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from inferences.serializers import InferenceOverviewSerializer
+from inferences.models import Inference
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import BasePermission
 from django.shortcuts import get_object_or_404
+from django.http import HttpResponse
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
 from .serializers import SimulationSerializer
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework import status
+from django.core.cache import cache
 from django.conf import settings
-from .models import Simulation
+from .models import Simulation, get_rolling_average, get_data_cache_key
 from django.db.models import Q
+import hashlib
+
+
+# Simulation columns needed to count migratory events and find the earliest introductions (events are read from
+# migratory_events_file when available; the JSON copy is then only loaded, lazily, for simulations without one)
+MIGRATORY_EVENT_FIELDS = ('uuid', 'populations', 'duration_days', 'outbreak_origin', 'migratory_events_file')
 
 
 # Custom permission to allow unauthenticated access for demo simulations
@@ -23,31 +36,46 @@ class AllowUnauthenticatedForDemo(BasePermission):
         
         # For inference deletion, you might need to get simulation UUID from the inference
         if 'inference_uuid' in view.kwargs:
-            try:
-                from .models import Inference  # Adjust import
-                inference = Inference.objects.get(uuid=view.kwargs['inference_uuid'])
-                simulation_uuid = inference.simulation.uuid
-            except Inference.DoesNotExist:
+            # read only the simulation's keywords, joined in the same query (no model instances)
+            keywords = Inference.objects.filter(uuid=view.kwargs['inference_uuid']).values_list('simulation__keywords', flat=True).first()
+            if keywords is None:
                 return False
+            # If it's a demo simulation, allow access regardless of authentication
+            if 'demo' in keywords:
+                return True
         
         # For direct simulation access
         elif 'simulation_uuid' in view.kwargs:
             simulation_uuid = view.kwargs['simulation_uuid']
         
         if simulation_uuid:
-            try:
-                simulation = Simulation.objects.get(uuid=simulation_uuid)
-                # If it's a demo simulation, allow access regardless of authentication
-                if 'demo' in simulation.keywords:
-                    return True
-            except Simulation.DoesNotExist:
+            is_demo = Simulation.is_demo_simulation(simulation_uuid)
+            if is_demo is None:
                 return False
+            # If it's a demo simulation, allow access regardless of authentication
+            if is_demo:
+                return True
         
         # For non-demo simulations, require authentication
         return request.user and request.user.is_authenticated
 
 
+# Paginator that shares the (COUNT(*)) total of a listing between its pages for a short while
+class CachedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        # key on the filtered query, so each search has its own count
+        query = str(self.object_list.query).encode()
+        cache_key = 'simulation_repository_count:' + hashlib.md5(query).hexdigest()
+        count = cache.get(cache_key)
+        if count is None:
+            count = self.object_list.count()
+            cache.set(cache_key, count, settings.SIMULATION_REPOSITORY_CACHE_TIMEOUT)
+        return count
+
+
 class CustomSetPagination(PageNumberPagination):
+    django_paginator_class = CachedCountPaginator
     page_size = settings.DEFAULT_PAGE_SIZE
     page_size_query_param = 'page_size'
     max_page_size = settings.MAX_PAGE_SIZE
@@ -55,6 +83,9 @@ class CustomSetPagination(PageNumberPagination):
 
 class SimulationRepository(APIView, CustomSetPagination):
     permission_classes = [AllowAny]  # Allow access to anyone
+    # fields listed for each simulation (also the only columns loaded), and the fields the listing can be ordered by
+    serializer_fields = ('uuid', 'num_demes', 'duration_days', 'total_population', 'total_infected', 'total_sampled')
+    allowed_ordering_fields = ('num_demes', 'duration_days', 'total_population', 'total_infected', 'total_sampled')
 
     def get_paginated_response(self, data, request):
         return Response(dict([
@@ -68,16 +99,21 @@ class SimulationRepository(APIView, CustomSetPagination):
         ]))
 
     def get(self, request, format=None):
+        # serve repeated listings (same search, ordering and page) from the cache for a short while
+        cache_key = 'simulation_repository:' + request.build_absolute_uri()
+        cached_data = cache.get(cache_key)
+        if cached_data is not None:
+            return Response(cached_data)
+
         # get the search parameter from the query
         search = request.query_params.get('search', None)
         
         # get the ordering parameter from the query
         ordering = request.query_params.get('ordering', None)
         descending = request.query_params.get('descending', 'false').lower() == 'true'
-        allowed_ordering_fields = ['num_demes', 'duration_days', 'total_population', 'total_infected', 'total_sampled']
 
-        # start with base queryset
-        simulation_queryset = Simulation.objects.filter(is_complete=True)
+        # start with base queryset (only loading the columns needed for the overview, not the large JSON fields)
+        simulation_queryset = Simulation.objects.filter(is_complete=True).only(*self.serializer_fields)
 
         # apply search filter if search parameter exists
         if search:
@@ -87,33 +123,42 @@ class SimulationRepository(APIView, CustomSetPagination):
             else:
                 simulation_queryset = simulation_queryset.filter(keywords__overlap=[search])
 
-        # apply ordering if valid
-        if ordering in allowed_ordering_fields:
+        # apply ordering if valid (uuid breaks ties, so that pages are stable and do not overlap; it is sorted in
+        # the same direction as the ordering field, so that a (field, uuid) index can be scanned either way)
+        if ordering in self.allowed_ordering_fields:
             if descending:
-                ordering = '-' + ordering
-            simulation_queryset = simulation_queryset.order_by(ordering)
+                simulation_queryset = simulation_queryset.order_by('-' + ordering, '-uuid')
+            else:
+                simulation_queryset = simulation_queryset.order_by(ordering, 'uuid')
+        else:
+            simulation_queryset = simulation_queryset.order_by('uuid')
 
         # paginate the queryset
         page = self.paginate_queryset(simulation_queryset, request)
 
         if page is not None:
-            serializer = SimulationSerializer(
-                page,
-                many=True,
-                fields=('uuid', 'num_demes', 'duration_days', 'total_population', 'total_infected', 'total_sampled'))
-            return self.get_paginated_response(serializer.data, request)
-        
-        serializer = SimulationSerializer(
-            simulation_queryset,
-            many=True,
-            fields=('uuid', 'num_demes', 'duration_days', 'total_population', 'total_infected', 'total_sampled'))
-        return Response(serializer.data)
+            serializer = SimulationSerializer(page, many=True, fields=self.serializer_fields)
+            response = self.get_paginated_response(serializer.data, request)
+        else:
+            serializer = SimulationSerializer(simulation_queryset, many=True, fields=self.serializer_fields)
+            response = Response(serializer.data)
+
+        cache.set(cache_key, response.data, settings.SIMULATION_REPOSITORY_CACHE_TIMEOUT)
+        return response
     
 
 @api_view(['GET'])
 @permission_classes([AllowAny])  # Allow access to anyone
 def get_simulation_data(request, simulation_uuid):    
-    simulation = get_object_or_404(Simulation, uuid=simulation_uuid)
+    # simulation data only changes when the simulation is saved (which drops the cached copy from the shared cache), so serve it from the cache;
+    # the cached copy is already JSON-encoded, so JSON responses skip serializing and encoding the large fields again
+    cache_key = get_data_cache_key(simulation_uuid)
+    cached_content = cache.get(cache_key)
+    if cached_content is not None and request.accepted_renderer.format == 'json':
+        return HttpResponse(cached_content, content_type='application/json')
+
+    # migratory events are not part of the response, so skip loading them
+    simulation = get_object_or_404(Simulation.objects.defer('migratory_events'), uuid=simulation_uuid)
     serializer = SimulationSerializer(
         simulation,
         fields=(
@@ -135,26 +180,51 @@ def get_simulation_data(request, simulation_uuid):
             'deme_sampled')
     )
 
+    # only complete simulations are cached (an incomplete one is still being populated, so its data is partial)
+    if simulation.is_complete:
+        cache.set(cache_key, JSONRenderer().render(serializer.data), settings.SIMULATION_DATA_CACHE_TIMEOUT)
     return Response(serializer.data)
 
 
 @api_view(['GET'])
 @permission_classes([AllowUnauthenticatedForDemo]) # Ensure only authenticated users can access this view
 def get_inference_tree(request, simulation_uuid):
-    simulation = get_object_or_404(Simulation, uuid=simulation_uuid)
+    # only keywords are needed from the simulation itself (the rest comes from its inferences)
+    simulation = get_object_or_404(Simulation.objects.only('uuid', 'keywords'), uuid=simulation_uuid)
 
     # get user if simulation is not a demo simulation
     request_user = request.user if request.user.is_authenticated and 'demo' not in simulation.keywords else None
-    # get inference tree
-    inference_tree = simulation.get_inference_tree(user=request_user)
-    # get UUID of most recent 3 inferences
-    recent_inferences = simulation.get_recent_inferences(user=request_user, N=3)
-
-    # get inference queryset and serialize
-    inferences = (
+    # get inference queryset to serialize (the serializer walks no reverse relations, so the joined
+    # samples_allocation and head are the only related rows it needs; the large JSON fields of each
+    # inference and its head are not part of the overview, so skip loading them)
+    inferences = list(
         simulation.inference_set.filter(Q(user=request_user) | Q(head__isnull=True))
         .select_related('samples_allocation', 'head')
+        .defer(
+            'sample_ids', 'inferred_migratory_events', 'inferred_tree_json',
+            'head__sample_ids', 'head__inferred_migratory_events', 'head__inferred_tree_json', 'head__evaluations')
     )
+
+    if request_user:
+        # the tree covers the same inferences as the overview (and the recent ones are the user's among them),
+        # so derive both from the inferences fetched above
+        tree_inferences = [{
+            'id': inference.id,
+            'uuid': inference.uuid,
+            'head_id': inference.head_id,
+            'dta_method': inference.dta_method,
+            'user_id': inference.user_id,
+            'created_at': inference.created_at,
+            } for inference in inferences]
+    else:
+        # the tree and recent inferences cover every inference of the simulation, so fetch them together
+        tree_inferences = list(simulation.inference_set.values('id', 'uuid', 'head_id', 'dta_method', 'user_id', 'created_at'))
+
+    # get inference tree
+    inference_tree = simulation.get_inference_tree(user=request_user, inferences=tree_inferences)
+    # get UUID of most recent 3 inferences
+    recent_inferences = simulation.get_recent_inferences(user=request_user, N=3, inferences=tree_inferences)
+
     serializer = InferenceOverviewSerializer(inferences, many=True)
 
     # convert the serializer output from a list to a dictionary with UUIDs as keys
@@ -170,50 +240,49 @@ def get_inference_tree(request, simulation_uuid):
 @api_view(['GET'])
 @permission_classes([AllowUnauthenticatedForDemo]) # Ensure only authenticated users can access this view
 def get_migratory_event_counts(request, simulation_uuid):
-    simulation = get_object_or_404(Simulation, uuid=simulation_uuid)
+    simulation = get_object_or_404(Simulation.objects.only(*MIGRATORY_EVENT_FIELDS), uuid=simulation_uuid)
 
     # get request params (deme, deme_pair, show_importation)
     deme = request.query_params.get('deme', None)
     deme_pair = request.query_params.get('deme_pair', None)
     show_importation = request.query_params.get('show_importation', 'true').lower() != 'false'
-    rolling_window = request.query_params.get('rolling_window', 7)
+    # rolling_window arrives as a string when given, so convert it once (and keep it within [1, duration_days])
+    try:
+        rolling_window = int(request.query_params.get('rolling_window', 7))
+    except ValueError:
+        return Response({'error': "'rolling_window' must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+    rolling_window = max(1, min(rolling_window, simulation.duration_days or rolling_window))
 
     if deme_pair is not None:
-        # get migration counts for a deme pair
+        # get migration counts for a deme pair, with and without rolling average (events are counted once)
         deme1, deme2 = deme_pair.split('-')
-        # with rolling average
-        migratory_event_counts_ra = simulation.get_migratory_event_counts(
+        migratory_event_counts = simulation.get_migratory_event_counts_by_window(
             demes=[int(deme1), int(deme2)],
             event_type='transfer',
-            rolling_window=rolling_window)
-        # without rolling average
-        migratory_event_counts_raw = simulation.get_migratory_event_counts(
-            demes=[int(deme1), int(deme2)],
-            event_type='transfer')
+            rolling_windows=[rolling_window, 1])
+        migratory_event_counts_ra = migratory_event_counts[rolling_window]
+        migratory_event_counts_raw = migratory_event_counts[1]
     else:
         if deme is None:
-            # get migration counts summed across all demes
-            # with rolling average
-            all_migratory_event_counts_ra = simulation.get_migratory_event_counts(
-                event_type='import' if show_importation else 'export',
-                rolling_window=rolling_window)
-            # without rolling average
-            all_migratory_event_counts_raw = simulation.get_migratory_event_counts(
+            # get migration counts summed across all demes, with and without rolling average (events are counted once,
+            # straight into a (deme x day) array, so the sum across demes is a single column sum)
+            _, all_migratory_event_counts = simulation.get_migratory_event_count_matrix(
                 event_type='import' if show_importation else 'export')
-            # sum the counts across all
-            migratory_event_counts_ra = list(map(sum, zip(*all_migratory_event_counts_ra.values())))
-            migratory_event_counts_raw = list(map(sum, zip(*all_migratory_event_counts_raw.values())))
+            total_event_counts = all_migratory_event_counts.sum(axis=0)
+            migratory_event_counts_raw = total_event_counts.tolist()
+            # the rolling average is linear, so average the summed counts once rather than every deme's counts
+            if rolling_window > 1:
+                migratory_event_counts_ra = get_rolling_average(total_event_counts, rolling_window)
+            else:
+                migratory_event_counts_ra = migratory_event_counts_raw
         else:
-            # get migration counts for a single deme
-            # with rolling average
-            migratory_event_counts_ra = simulation.get_migratory_event_counts(
+            # get migration counts for a single deme, with and without rolling average (events are counted once)
+            migratory_event_counts = simulation.get_migratory_event_counts_by_window(
                 demes=[int(deme)],
                 event_type='import' if show_importation else 'export',
-                rolling_window=rolling_window)[int(deme)]
-            # without rolling average
-            migratory_event_counts_raw = simulation.get_migratory_event_counts(
-                demes=[int(deme)],
-                event_type='import' if show_importation else 'export')[int(deme)]
+                rolling_windows=[rolling_window, 1])
+            migratory_event_counts_ra = migratory_event_counts[rolling_window][int(deme)]
+            migratory_event_counts_raw = migratory_event_counts[1][int(deme)]
             
     return Response({
         'simulation_uuid': simulation_uuid,
@@ -228,7 +297,7 @@ def get_migratory_event_counts(request, simulation_uuid):
 @api_view(['GET'])
 @permission_classes([AllowUnauthenticatedForDemo]) # Ensure only authenticated users can access this view
 def get_earliest_introductions(request, simulation_uuid):
-    simulation = get_object_or_404(Simulation, uuid=simulation_uuid)
+    simulation = get_object_or_404(Simulation.objects.only(*MIGRATORY_EVENT_FIELDS), uuid=simulation_uuid)
 
     # get earliest importation events for each deme
     earliest_introductions = simulation.get_earliest_importation()
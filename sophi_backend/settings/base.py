@@ -114,6 +114,8 @@ DATABASES = {
         'PASSWORD': os.getenv("DB_PASSWORD"),
         'HOST': os.getenv("DB_HOST", "localhost"),
         'PORT': os.getenv("DB_PORT", "5432"),
+        'CONN_MAX_AGE': int(os.getenv("DB_CONN_MAX_AGE", "60")),  # keep connections open between requests (seconds)
+        'CONN_HEALTH_CHECKS': True,  # check persistent connections are still usable before reusing them
     }
 }
 
@@ -167,9 +169,21 @@ MEDIA_ROOT = os.getenv("MEDIA_ROOT", BASE_DIR / 'media')  # Directory for media
 SIMULATIONS_FOLDER = 'simulations/'  # Subdirectory for simulation data
 
 
+# Cache shared by all web workers (and shells), so that invalidation on save reaches every process
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/1"),
+    }
+}
+
+
 # Simulations pagination settings
 DEFAULT_PAGE_SIZE = 10
 MAX_PAGE_SIZE = 100
+SIMULATION_REPOSITORY_CACHE_TIMEOUT = 60  # seconds to cache each simulation repository listing (uses the default cache)
+DEMO_SIMULATION_CACHE_TIMEOUT = 3600  # seconds to cache whether a simulation is a demo (invalidated on save)
+SIMULATION_DATA_CACHE_TIMEOUT = 60 * 60 * 24  # seconds to cache the data of each complete simulation (invalidated on save)
 
 
 # Inference data
@@ -1,4 +1,5 @@
 import subprocess
+import os
 from django.db import connections
 from django.http import JsonResponse
 from django.conf import settings
@@ -6,17 +7,31 @@ from django.conf import settings
 
 def get_git_version():
     """Retrieve the current Git commit hash as the app version."""
+    # prefer a hash recorded at build time (GIT_SHA environment variable or file), so that no git process is needed
+    if os.getenv("GIT_SHA"):
+        return os.getenv("GIT_SHA")
+    git_sha_file = settings.BASE_DIR / "GIT_SHA"
+    if git_sha_file.is_file():
+        return git_sha_file.read_text().strip()
     try:
         return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"]).decode("utf-8").strip()
     except Exception:
         return "unknown"
 
 
+# The commit cannot change while the process runs, so look it up once at import rather than on every
+# health check
+GIT_VERSION = get_git_version()
+
+
 def health_check(request):
     """Returns system health status and version info."""
     # Check database connectivity
     try:
-        connections["default"].cursor()
+        # run a trivial query on the (persistent) connection, so that a connection to a database that has
+        # gone away is reported; the cursor is closed straight away
+        with connections["default"].cursor() as cursor:
+            cursor.execute("SELECT 1")
         db_status = "ok"
     except Exception:
         db_status = "error"
@@ -24,7 +39,7 @@ def health_check(request):
     response_data = {
         "status": db_status,
         "version": settings.APP_VERSION if hasattr(settings, "APP_VERSION") else None,
-        "git_version": get_git_version(),  # Retrieve from Git
+        "git_version": GIT_VERSION,  # Retrieved from Git at startup
         "debug": settings.DEBUG,  # Show if debug mode is enabled
     }
 